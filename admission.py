@@ -0,0 +1,159 @@
+import time
+import asyncio
+import threading
+import contextlib
+from collections import deque
+
+from llm_client import _percentile, METRICS_WINDOW
+
+# ADMISSION CONTROL
+# Bounds the work the gateway takes on: at most `limit` requests in the CPU
+# stage (Presidio/spaCy) at once, and upstream LLM calls paced by a token
+# bucket. Requests beyond a bounded wait queue, or that would wait past their
+# deadline, are turned away at once with Busy instead of timing out later.
+class Busy(Exception):
+    def __init__(self, stage, reason, retry_after):
+        super().__init__(f"{stage} stage {reason}; try again in {max(1, round(retry_after))}s")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+class _WaitStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=METRICS_WINDOW)
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "deadline": 0}
+
+    def enter_queue(self):
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def leave_queue(self):
+        with self._lock: self.waiting -= 1
+
+    def admit(self, waited):
+        with self._lock:
+            self.admitted += 1
+            self._waits.append(waited * 1000)
+
+    def reject(self, reason):
+        with self._lock: self.rejected[reason] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"waiting": self.waiting, "max_waiting": self.max_waiting, "admitted": self.admitted, "rejected": dict(self.rejected),
+                    "p50_wait_ms": _percentile(self._waits, 0.5), "p95_wait_ms": _percentile(self._waits, 0.95)}
+
+class ConcurrencyGate:
+    """At most `limit` holders at once; up to `max_queue` more may wait, each for at most `timeout` seconds."""
+
+    def __init__(self, name, limit, max_queue=64, timeout=10.0):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._stats = _WaitStats()
+
+    @contextlib.contextmanager
+    def slot(self):
+        began = time.monotonic()
+        with self._cond:
+            if self._active >= self.limit:
+                if self._stats.waiting >= self.max_queue:
+                    self._stats.reject("queue_full")
+                    raise Busy(self.name, "is at capacity", self.timeout / 2)
+                self._stats.enter_queue()
+                try: admitted = self._cond.wait_for(lambda: self._active < self.limit, timeout=self.timeout)
+                finally: self._stats.leave_queue()
+                if not admitted:
+                    self._stats.reject("deadline")
+                    raise Busy(self.name, f"had no free slot within {self.timeout:.0f}s", self.timeout / 2)
+            self._active += 1
+        self._stats.admit(time.monotonic() - began)
+        try: yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond: active = self._active
+        return dict(self._stats.stats(), active=active, limit=self.limit)
+
+class TokenBucket:
+    """`rate` calls per second with bursts of up to `burst`.
+
+    A caller reserves the next token up front and sleeps until it is due, so
+    callers are served in arrival order. A reservation that would be due later
+    than `timeout`, or with `max_queue` callers already waiting, is refused.
+    """
+
+    def __init__(self, name, rate, burst=10, max_queue=64, timeout=10.0):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._stats = _WaitStats()
+
+    def _reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if wait > 0 and self._stats.waiting >= self.max_queue:
+                self._stats.reject("queue_full")
+                raise Busy(self.name, "is at capacity", wait)
+            if wait > self.timeout:
+                self._stats.reject("deadline")
+                raise Busy(self.name, "is rate limited", wait)
+            self._tokens -= 1
+            if wait > 0: self._stats.enter_queue()
+            return wait
+
+    def acquire(self):
+        wait = self._reserve()
+        if wait > 0:
+            try: time.sleep(wait)
+            finally: self._stats.leave_queue()
+        self._stats.admit(wait)
+
+    async def acquire_async(self):
+        wait = self._reserve()
+        if wait > 0:
+            try: await asyncio.sleep(wait)
+            finally: self._stats.leave_queue()
+        self._stats.admit(wait)
+
+    def stats(self):
+        with self._lock: tokens = min(self.burst, self._tokens + (time.monotonic() - self._updated) * self.rate)
+        return dict(self._stats.stats(), tokens=round(tokens, 2), rate=self.rate)
+
+class AdmissionController:
+    """The CPU-stage gate and the (optional) upstream token bucket, with their queue metrics."""
+
+    def __init__(self, cpu_limit, max_queue=64, timeout=10.0, llm_rate=0.0, llm_burst=10):
+        self.cpu = ConcurrencyGate("analysis", cpu_limit, max_queue=max_queue, timeout=timeout)
+        self.llm = TokenBucket("LLM", llm_rate, burst=llm_burst, max_queue=max_queue, timeout=timeout) if llm_rate > 0 else None
+
+    def cpu_slot(self):
+        return self.cpu.slot()
+
+    def before_llm_call(self):
+        if self.llm is not None: self.llm.acquire()
+
+    async def before_llm_call_async(self):
+        if self.llm is not None: await self.llm.acquire_async()
+
+    def stats(self):
+        return {"cpu": self.cpu.stats(), "llm": self.llm.stats() if self.llm is not None else None}
@@ -0,0 +1,137 @@
+import datetime
+import threading
+from collections import Counter, defaultdict
+import pandas as pd
+
+# ROLLUP RESOLUTIONS
+# Bucket keys are prefixes of the ISO timestamp, so they sort and compare as strings.
+RESOLUTIONS = {
+    "minute": {"key_len": 16, "format": "%Y-%m-%dT%H:%M", "freq": "min", "retention": datetime.timedelta(days=2)},
+    "hour": {"key_len": 13, "format": "%Y-%m-%dT%H", "freq": "h", "retention": datetime.timedelta(days=90)},
+    "day": {"key_len": 10, "format": "%Y-%m-%d", "freq": "D", "retention": None},
+}
+
+def bucket_key(timestamp, resolution):
+    return timestamp[:RESOLUTIONS[resolution]["key_len"]]
+
+def parse_bucket(key, resolution):
+    return datetime.datetime.strptime(key, RESOLUTIONS[resolution]["format"])
+
+# INCREMENTAL AGGREGATION
+class AuditAggregator:
+    """Running dashboard counters that fold in only events added since the last refresh."""
+
+    def __init__(self, store, read_limit=10000):
+        self.store = store
+        self.read_limit = read_limit
+        self._lock = threading.Lock()
+        self._cursor = None
+        self._reset()
+
+    def _reset(self):
+        self.operations = 0
+        self.blocked = 0
+        self.risk_types = Counter()
+        # Per resolution: bucket -> blocked items, and bucket -> Counter of entity types.
+        self.blocked_rollups = {res: Counter() for res in RESOLUTIONS}
+        self.entity_rollups = {res: defaultdict(Counter) for res in RESOLUTIONS}
+        self.latest = None
+
+    def refresh(self):
+        with self._lock:
+            folded = False
+            while True:
+                events, self._cursor, restarted = self.store.read_since(self._cursor, limit=self.read_limit)
+                if restarted: self._reset()
+                for event in events: self._fold(event)
+                folded = folded or bool(events)
+                if len(events) < self.read_limit: break
+            if folded: self._expire()
+        return self
+
+    def _fold(self, event):
+        blocked = event.get("blocked_items", 0)
+        risks = event.get("risk_types", [])
+        self.operations += 1
+        self.blocked += blocked
+        self.risk_types.update(risks)
+        timestamp = event.get("timestamp")
+        if not timestamp: return
+        if self.latest is None or timestamp > self.latest: self.latest = timestamp
+        for res in RESOLUTIONS:
+            key = bucket_key(timestamp, res)
+            self.blocked_rollups[res][key] += blocked
+            self.entity_rollups[res][key].update(risks)
+
+    def _expire(self):
+        # Fine-grained buckets are only kept for as long as a range selector can ask for them.
+        latest = parse_bucket(bucket_key(self.latest, "minute"), "minute")
+        for res, spec in RESOLUTIONS.items():
+            if spec["retention"] is None: continue
+            cutoff = bucket_key((latest - spec["retention"]).isoformat(), res)
+            for key in [k for k in self.blocked_rollups[res] if k < cutoff]:
+                del self.blocked_rollups[res][key]
+                self.entity_rollups[res].pop(key, None)
+
+    def primary_threat(self):
+        top = self.risk_types.most_common(1)
+        return top[0][0] if top else "None"
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "operations": self.operations,
+                "blocked": self.blocked,
+                "primary_threat": self.primary_threat(),
+                "risk_types": dict(self.risk_types),
+            }
+
+    def series(self, resolution, since=None):
+        """Sorted (bucket, blocked items) pairs at `resolution`, optionally from `since` on."""
+        start = bucket_key(since.isoformat(), resolution) if since else ""
+        with self._lock:
+            return sorted((k, v) for k, v in self.blocked_rollups[resolution].items() if k >= start)
+
+    def entity_counts(self, resolution, since=None):
+        start = bucket_key(since.isoformat(), resolution) if since else ""
+        totals = Counter()
+        with self._lock:
+            for key, counts in self.entity_rollups[resolution].items():
+                if key >= start: totals.update(counts)
+        return dict(totals)
+
+# TIME RANGES
+# Each range maps to the coarsest resolution that still gives a readable line,
+# so the chart payload stays bounded regardless of how many events were logged.
+TIME_RANGES = {
+    "Last hour": (datetime.timedelta(hours=1), "minute"),
+    "Last 24 hours": (datetime.timedelta(days=1), "hour"),
+    "Last 7 days": (datetime.timedelta(days=7), "hour"),
+    "Last 30 days": (datetime.timedelta(days=30), "day"),
+    "Last 12 months": (datetime.timedelta(days=365), "day"),
+    "All time": (None, "day"),
+}
+MAX_CHART_POINTS = 500
+
+def resolve_range(label, now=None):
+    """Return (since, resolution) for a TIME_RANGES label."""
+    span, resolution = TIME_RANGES[label]
+    if span is None: return None, resolution
+    return (now or datetime.datetime.now()) - span, resolution
+
+def timeline_series(aggregator, label, now=None):
+    """Zero-filled blocked-items series for a range, downsampled to at most MAX_CHART_POINTS."""
+    now = now or datetime.datetime.now()
+    since, resolution = resolve_range(label, now)
+    spec = RESOLUTIONS[resolution]
+    points = aggregator.series(resolution, since)
+    if not points: return pd.Series(dtype="int64", name="blocked_items")
+    keys, values = zip(*points)
+    series = pd.Series(values, index=pd.to_datetime(keys, format=spec["format"]), name="blocked_items")
+    start = series.index[0] if since is None else pd.Timestamp(since).floor(spec["freq"])
+    full_range = pd.date_range(start, pd.Timestamp(now).floor(spec["freq"]), freq=spec["freq"])
+    series = series.reindex(full_range.union(series.index), fill_value=0)
+    if len(series) > MAX_CHART_POINTS:
+        step = -(-len(series) // MAX_CHART_POINTS)
+        series = series.resample(f"{step}{spec['freq']}").sum()
+    return series
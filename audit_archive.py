@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import datetime
+import logging
+import threading
+from collections import defaultdict
+import pandas as pd
+
+from audit_store import JsonlAuditStore, file_lock, matches, risk_counts, _decode
+
+log = logging.getLogger(__name__)
+
+# ROTATING STORE
+# The active JSONL segment is sealed once it reaches a size or age threshold and
+# compacted into day-partitioned Parquet files:
+#
+#   audit_archive/
+#       manifest.jsonl                      one line per compacted segment, in order
+#       sealed-<ns>-<pid>.jsonl             sealed, waiting for compaction
+#       date=YYYY-MM-DD/part-<ns>-<pid>.parquet
+#
+# Segments form one ordered sequence (compacted, then sealed, then active) and a
+# segment keeps its position in it as it moves from sealed to compacted, so a
+# read_since() cursor of (segment index, inode, byte offset) survives rotation.
+
+TAIL_CACHE_SEGMENTS = 4
+
+class _Segment:
+    __slots__ = ("kind", "name", "inode", "path", "days")
+
+    def __init__(self, kind, name, inode, path=None, days=()):
+        self.kind, self.name, self.inode, self.path, self.days = kind, name, inode, path, days
+
+class RotatingAuditStore:
+    """JSONL audit store whose history is rotated into a columnar, time-partitioned archive."""
+
+    def __init__(self, path, archive_dir, max_bytes=64 * 1024 * 1024, max_age=datetime.timedelta(days=1), legacy_path=None):
+        self.active = JsonlAuditStore(path, legacy_path=legacy_path)
+        self.path = path
+        self.archive_dir = archive_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(archive_dir, exist_ok=True)
+        self._manifest_path = os.path.join(archive_dir, "manifest.jsonl")
+        self._lock_path = os.path.join(archive_dir, ".lock")
+        self._first_timestamp = (None, None)
+        self._compact_lock = threading.Lock()
+        self._tails = {}  # (segment name, limit) -> last records of that archived segment
+        self._housekeeping(self.compact_pending)
+
+    def exists(self):
+        return self.active.exists() or os.path.exists(self._manifest_path) or bool(self._pending())
+
+    # Writing
+    def append(self, entries, durability="flush"):
+        self.active.append(entries, durability=durability)
+        # The entries are persisted at this point; rotation is housekeeping on top and never fails the write.
+        self._housekeeping(self._rotate_if_due)
+
+    def _rotate_if_due(self):
+        if self._should_rotate(): self.rotate()
+
+    def _housekeeping(self, fn):
+        # A segment that fails to rotate or compact stays readable where it is and is retried later.
+        try: fn()
+        except Exception: log.exception("Audit log rotation/compaction failed; retrying on a later write or restart")
+
+    def _should_rotate(self):
+        try: stat = os.stat(self.path)
+        except FileNotFoundError: return False
+        if stat.st_size >= self.max_bytes: return True
+        if self.max_age is None or stat.st_size == 0: return False
+        first = self._active_first_timestamp(stat.st_ino)
+        return first is not None and datetime.datetime.now() - first >= self.max_age
+
+    def _active_first_timestamp(self, inode):
+        if self._first_timestamp[0] != inode:
+            with open(self.path, "rb") as f: record = _decode(f.readline())
+            try: first = datetime.datetime.fromisoformat(record["timestamp"])
+            except (TypeError, KeyError, ValueError): first = None
+            self._first_timestamp = (inode, first)
+        return self._first_timestamp[1]
+
+    def rotate(self):
+        """Seal the active segment and compact every sealed segment into the archive."""
+        with file_lock(self._lock_path):
+            if not self._should_rotate(): return False
+            sealed = os.path.join(self.archive_dir, f"sealed-{time.time_ns()}-{os.getpid()}.jsonl")
+            # On Windows the rename fails while another process has the file open; retry on a later append.
+            try: os.replace(self.path, sealed)
+            except OSError: return False
+        self.compact_pending()
+        return True
+
+    def compact_pending(self):
+        with self._compact_lock, file_lock(self._lock_path):
+            done = {entry["segment"] for entry in self._manifest()}
+            for path in self._pending():
+                name = _segment_name(path)
+                if name not in done: self._compact(path, name)
+                try: os.remove(path)
+                except OSError: pass
+
+    def _compact(self, path, name):
+        inode = os.stat(path).st_ino
+        by_day, offset = defaultdict(list), 0
+        # Holding the segment's own lock waits out any writer that opened it before the rename.
+        with file_lock(path), open(path, "rb") as f:
+            for line in f:
+                record = _decode(line)
+                if record is not None: by_day[record.get("timestamp", "")[:10] or "unknown"].append((offset, record))
+                offset += len(line)
+        for day, rows in by_day.items():
+            part_dir = os.path.join(self.archive_dir, f"date={day}")
+            os.makedirs(part_dir, exist_ok=True)
+            target = os.path.join(part_dir, f"part-{name}.parquet")
+            _to_frame(rows).to_parquet(f"{target}.tmp", index=False)
+            os.replace(f"{target}.tmp", target)
+        entry = {"segment": name, "inode": inode, "bytes": offset, "days": sorted(by_day),
+                 "rows": sum(len(rows) for rows in by_day.values())}
+        with open(self._manifest_path, "ab") as f:
+            f.write((json.dumps(entry) + "\n").encode("utf-8"))
+
+    # Layout
+    def _manifest(self):
+        if not os.path.exists(self._manifest_path): return []
+        with open(self._manifest_path, "rb") as f:
+            return [entry for entry in (_decode(line) for line in f) if entry is not None]
+
+    def _pending(self):
+        names = [n for n in os.listdir(self.archive_dir) if n.startswith("sealed-") and n.endswith(".jsonl")]
+        return [os.path.join(self.archive_dir, n) for n in sorted(names)]
+
+    def _segments(self):
+        # Pending is listed before the manifest is read: a segment compacted in
+        # between then shows up twice (and is de-duplicated) rather than not at all.
+        pending = self._pending()
+        segments = [_Segment("archived", e["segment"], e["inode"], days=e["days"]) for e in self._manifest()]
+        archived = {segment.name for segment in segments}
+        for path in pending:
+            name = _segment_name(path)
+            if name in archived: continue
+            try: segments.append(_Segment("sealed", name, os.stat(path).st_ino, path=path))
+            except FileNotFoundError: pass
+        try: active_inode = os.stat(self.path).st_ino
+        except FileNotFoundError: active_inode = None
+        segments.append(_Segment("active", None, active_inode, path=self.path))
+        return segments
+
+    def _partition_files(self, segment):
+        return [os.path.join(self.archive_dir, f"date={day}", f"part-{segment.name}.parquet") for day in segment.days]
+
+    # Reading
+    def iter_events(self, start=None, end=None, entities=None):
+        # Only partitions whose day overlaps [start, end) are opened.
+        first_day, last_day = (start or "")[:10], (end or "")[:10]
+        for segment in self._segments():
+            f = None
+            while segment is not None and segment.kind != "archived":
+                f = self._open(segment)
+                if f is not None: break
+                segments, index = self._relocate(segment)
+                segment = segments[index] if index is not None else None
+            if segment is None: continue
+            if f is not None:
+                with f:
+                    for line in f:
+                        record = _decode(line)
+                        if record is not None and matches(record, start, end, entities): yield record
+                continue
+            for day, path in zip(segment.days, self._partition_files(segment)):
+                if (first_day and day < first_day) or (last_day and day > last_day): continue
+                for record in _read_parquet(path):
+                    if matches(record, start, end, entities): yield record
+
+    def read_since(self, cursor=None, limit=10000):
+        """Up to `limit` events after `cursor`, walking archived, sealed and active segments in order."""
+        segments = self._segments()
+        index, pos, restarted = 0, 0, False
+        if cursor is not None:
+            index, inode, pos = cursor
+            if index >= len(segments) or (inode is not None and segments[index].inode != inode):
+                index, pos, restarted = 0, 0, True
+        events = []
+        while True:
+            segment = segments[index]
+            wanted = limit - len(events)
+            batch, pos, moved = self._read_segment(segment, pos, wanted)
+            if moved:
+                # Sealed or compacted mid-read: the offset is the same in its new form, so carry on from there.
+                relisted, moved_to = self._relocate(segment)
+                if moved_to is not None:
+                    segments, index = relisted, moved_to
+                    continue
+            events.extend(batch)
+            if len(batch) == wanted or index == len(segments) - 1: break
+            index, pos = index + 1, 0
+        return events, (index, segments[index].inode, pos), restarted
+
+    def _read_segment(self, segment, pos, limit):
+        """(events, next position, moved); `moved` means the segment is no longer where it was listed."""
+        if segment.kind != "archived":
+            if segment.inode is None: return [], 0, False
+            batch, cursor, restarted = JsonlAuditStore(segment.path).read_since((segment.inode, pos), limit=limit)
+            if cursor is None or cursor[0] != segment.inode: return [], pos, True
+            return batch, cursor[1], False
+        rows = []
+        for path in self._partition_files(segment):
+            rows.extend(_read_parquet(path, min_offset=pos))
+        rows.sort(key=lambda record: record["segment_offset"])
+        rows = rows[:limit]
+        return rows, (rows[-1]["segment_offset"] + 1 if rows else pos), False
+
+    def _open(self, segment):
+        """The JSONL file of a sealed or active segment, or None once it has been sealed or compacted since it was listed."""
+        try: f = open(segment.path, "rb")
+        except FileNotFoundError: return None
+        if segment.inode is not None and os.fstat(f.fileno()).st_ino != segment.inode:
+            f.close()
+            return None
+        return f
+
+    def _relocate(self, segment):
+        """(segments, index) of where a listed sealed or active segment lives now; index is None if it is gone.
+
+        A sealed segment is found in the manifest by name. The active one is found by inode, which it keeps
+        when it is sealed and which the manifest records; the newest match wins in case an inode was reused.
+        """
+        segments = self._segments()
+        for index in reversed(range(len(segments))):
+            candidate = segments[index]
+            if segment.kind == "sealed" and candidate.kind == "archived" and candidate.name == segment.name: return segments, index
+            if segment.kind == "active" and candidate.kind != "active" and segment.inode is not None and candidate.inode == segment.inode: return segments, index
+        return segments, None
+
+    def recent_events(self, limit=500):
+        records = self.active.recent_events(limit)
+        for segment in reversed(self._segments()[:-1]):
+            if len(records) >= limit: break
+            wanted = limit - len(records)
+            if segment.kind == "sealed": older = JsonlAuditStore(segment.path).recent_events(wanted)
+            else: older = self._archived_tail(segment, limit)
+            records = older[-wanted:] + records
+        for record in records: record.pop("segment_offset", None)
+        return records[-limit:]
+
+    def _archived_tail(self, segment, limit):
+        """The last `limit` records of an archived segment, read from its newest day partitions only.
+
+        Archived segments never change, so the dashboard pays for this once per rotation, not on every rerun.
+        """
+        key = (segment.name, limit)
+        tail = self._tails.get(key)
+        if tail is None:
+            rows = []
+            for path in reversed(self._partition_files(segment)):
+                rows = _read_parquet(path) + rows
+                if len(rows) >= limit: break
+            rows.sort(key=lambda record: record["segment_offset"])
+            if len(self._tails) >= TAIL_CACHE_SEGMENTS: self._tails.clear()
+            tail = self._tails[key] = rows[-limit:]
+        return [dict(record) for record in tail]
+
+def _segment_name(path):
+    return os.path.basename(path)[len("sealed-"):-len(".jsonl")]
+
+# PARQUET ENCODING
+def _to_frame(rows):
+    return pd.DataFrame({
+        "segment_offset": [offset for offset, _ in rows],
+        "timestamp": [r.get("timestamp", "") for _, r in rows],
+        "event": [r.get("event", "") for _, r in rows],
+        "input_length": [r.get("input_length") for _, r in rows],
+        "blocked_items": [r.get("blocked_items", 0) for _, r in rows],
+        "risk_types": [list(r.get("risk_types", [])) for _, r in rows],
+        "risk_counts": [json.dumps(risk_counts(r)) for _, r in rows],
+    })
+
+def _read_parquet(path, min_offset=0):
+    try: frame = pd.read_parquet(path, filters=[("segment_offset", ">=", min_offset)] if min_offset else None)
+    except FileNotFoundError: return []
+    records = []
+    for row in frame.itertuples(index=False):
+        counts = json.loads(row.risk_counts)
+        records.append({"segment_offset": int(row.segment_offset), "timestamp": row.timestamp, "event": row.event,
+                        "input_length": row.input_length, "blocked_items": int(row.blocked_items),
+                        "risk_types": list(row.risk_types), "risk_counts": counts, "details": str(counts)})
+    return records
@@ -0,0 +1,78 @@
+import io
+import os
+import csv
+import zlib
+import argparse
+import datetime
+
+from audit_store import SqliteAuditStore
+from audit_archive import RotatingAuditStore
+
+REPORT_COLUMNS = ["timestamp", "event", "input_length", "blocked_items", "risk_types", "details"]
+
+# STREAMING CSV
+def iter_csv_chunks(store, start=None, end=None, entities=None, chunk_rows=1000):
+    """Yield the compliance report as UTF-8 CSV chunks of at most `chunk_rows` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(REPORT_COLUMNS)
+    rows = 0
+    for record in store.iter_events(start=start, end=end, entities=entities):
+        writer.writerow([
+            record.get("timestamp", ""),
+            record.get("event", ""),
+            record.get("input_length", ""),
+            record.get("blocked_items", 0),
+            ";".join(record.get("risk_types", [])),
+            record.get("details", ""),
+        ])
+        rows += 1
+        if rows % chunk_rows == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell(): yield buffer.getvalue().encode("utf-8")
+
+def gzip_chunks(chunks, level=6):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data: yield data
+    yield compressor.flush()
+
+def write_report(store, dest, start=None, end=None, entities=None, compress=False):
+    """Stream the report into a binary file object; returns bytes written."""
+    chunks = iter_csv_chunks(store, start=start, end=end, entities=entities)
+    if compress: chunks = gzip_chunks(chunks)
+    written = 0
+    for chunk in chunks:
+        dest.write(chunk)
+        written += len(chunk)
+    return written
+
+def date_bounds(start_date=None, end_date=None):
+    """Inclusive calendar dates -> [start, end) ISO bounds used by the stores."""
+    start = start_date.isoformat() if start_date else None
+    end = (end_date + datetime.timedelta(days=1)).isoformat() if end_date else None
+    return start, end
+
+def open_store(path, archive_dir=None):
+    """The store behind `path`; a JSONL log is read together with its sealed and archived segments."""
+    if path.endswith(".db"): return SqliteAuditStore(path)
+    return RotatingAuditStore(path, archive_dir or os.path.join(os.path.dirname(path), "audit_archive"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the audit log as a compliance CSV report.")
+    parser.add_argument("output", help="Destination file (use '.csv.gz' together with --gzip)")
+    parser.add_argument("--store", default="audit_log.jsonl", help="audit_log.jsonl or an SQLite .db file")
+    parser.add_argument("--archive-dir", help="Rotated segments of a JSONL store (default: audit_archive next to it)")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.date.fromisoformat, help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument("--entity", action="append", dest="entities", help="Only events with this entity type (repeatable)")
+    parser.add_argument("--gzip", action="store_true", help="Gzip-compress the report")
+    args = parser.parse_args()
+
+    start, end = date_bounds(args.start, args.end)
+    with open(args.output, "wb") as f:
+        size = write_report(open_store(args.store, args.archive_dir), f, start=start, end=end, entities=args.entities, compress=args.gzip)
+    print(f"Wrote {size} bytes to {args.output}")
@@ -0,0 +1,389 @@
+import os
+import ast
+import json
+import sqlite3
+import time
+import queue
+import atexit
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# FILE LOCKING
+# Cross-process exclusive lock so concurrent Streamlit sessions (or several
+# gateway processes) never interleave partial records in the same file.
+_thread_lock = threading.Lock()
+
+def _lock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+def _unlock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Exclusive cross-process lock held on `path` for the duration of the block."""
+    with open(path, "ab") as f:
+        _lock(f)
+        try: yield
+        finally: _unlock(f)
+
+def _same_file(f, path):
+    try: return os.fstat(f.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError: return False
+
+def _encode(entry):
+    return (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+
+# JSONL STORE
+class JsonlAuditStore:
+    """Append-only audit log with one JSON record per line."""
+
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        if legacy_path: migrate_legacy_log(legacy_path, path)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def append(self, entries, durability="flush"):
+        if isinstance(entries, dict): entries = [entries]
+        payload = b"".join(_encode(e) for e in entries)
+        if not payload: return
+        with _thread_lock:
+            while True:
+                with open(self.path, "ab") as f:
+                    _lock(f)
+                    try:
+                        # The file may have been rotated away between open() and the lock.
+                        if not _same_file(f, self.path): continue
+                        # Records must reach the OS before the lock is released, so
+                        # "none" and "flush" behave the same for this store.
+                        f.write(payload)
+                        f.flush()
+                        if durability == "fsync": os.fsync(f.fileno())
+                        return
+                    finally:
+                        _unlock(f)
+
+    def iter_events(self, start=None, end=None, entities=None):
+        if not self.exists(): return
+        with open(self.path, "rb") as f:
+            for line in f:
+                record = _decode(line)
+                if record is not None and matches(record, start, end, entities): yield record
+
+    def read_since(self, cursor=None, limit=10000):
+        """Up to `limit` events appended after `cursor`; returns (events, cursor, restarted).
+
+        The cursor is (inode, byte offset). If the file was replaced or truncated
+        reading restarts from the top and `restarted` is True.
+        """
+        if not self.exists(): return [], None, cursor is not None
+        stat = os.stat(self.path)
+        restarted = cursor is not None and (cursor[0] != stat.st_ino or cursor[1] > stat.st_size)
+        offset = 0 if cursor is None or restarted else cursor[1]
+        events = []
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                # A record without its newline is still being written; pick it up next time.
+                if not line.endswith(b"\n") or len(events) >= limit: break
+                offset += len(line)
+                record = _decode(line)
+                if record is not None: events.append(record)
+        return events, (stat.st_ino, offset), restarted
+
+    def recent_events(self, limit=500):
+        if not self.exists(): return []
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            chunk = b""
+            while position > 0 and chunk.count(b"\n") <= limit:
+                step = min(65536, position)
+                position -= step
+                f.seek(position)
+                chunk = f.read(step) + chunk
+        lines = chunk.splitlines()
+        if position > 0: lines = lines[1:]
+        records = [r for r in (_decode(line) for line in lines) if r is not None]
+        return records[-limit:]
+
+def matches(record, start=None, end=None, entities=None):
+    """Filter for [start, end) ISO timestamp bounds and any-of entity types."""
+    timestamp = record.get("timestamp", "")
+    if start and timestamp < start: return False
+    if end and timestamp >= end: return False
+    if entities and not set(entities).intersection(record.get("risk_types", [])): return False
+    return True
+
+def _decode(line):
+    line = line.strip()
+    if not line: return None
+    # A torn trailing line (crash mid-write) is skipped rather than failing the read.
+    try: return json.loads(line)
+    except ValueError: return None
+
+# LEGACY MIGRATION
+def read_legacy_log(legacy_path):
+    with open(legacy_path, "r") as f:
+        try: data = json.load(f)
+        except ValueError: data = []
+    return data if isinstance(data, list) else []
+
+def migrate_legacy_log(legacy_path, path):
+    """Convert the old JSON-array audit file into JSONL once, atomically."""
+    if os.path.exists(path) or not os.path.exists(legacy_path): return 0
+    records = read_legacy_log(legacy_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        for record in records: f.write(_encode(record))
+    try:
+        if os.path.exists(path): os.remove(tmp_path)
+        else: os.replace(tmp_path, path)
+    except OSError:
+        try: os.remove(tmp_path)
+        except OSError: pass
+    return len(records)
+
+# SQLITE STORE
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    event TEXT NOT NULL,
+    input_length INTEGER,
+    blocked_items INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS audit_risks (
+    event_id INTEGER NOT NULL REFERENCES audit_events(id) ON DELETE CASCADE,
+    risk_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (event_id, risk_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_audit_events_timestamp ON audit_events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_audit_risks_type ON audit_risks(risk_type);
+"""
+_SYNCHRONOUS = {"none": "OFF", "flush": "NORMAL", "fsync": "FULL"}
+
+def risk_counts(entry):
+    """Per-type counts of an audit record, including records written before risk_counts existed."""
+    counts = entry.get("risk_counts")
+    if isinstance(counts, dict): return counts
+    try: counts = ast.literal_eval(entry.get("details", ""))
+    except (ValueError, SyntaxError): counts = None
+    if isinstance(counts, dict): return counts
+    return {risk: 1 for risk in entry.get("risk_types", [])}
+
+class SqliteAuditStore:
+    """Audit store in a WAL-mode SQLite database with risk types in a child table."""
+
+    def __init__(self, path, import_paths=(), import_stores=()):
+        """On first use the database is filled from the first existing history: a store from
+        `import_stores` (e.g. the rotating JSONL store with its archive), else a file from `import_paths`."""
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn: conn.executescript(_SCHEMA)
+        sources = [store.iter_events for store in import_stores if store.exists()]
+        sources += [lambda p=p: read_log_file(p) for p in import_paths if os.path.exists(p)]
+        if sources: self._import_once(sources[0])
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def _import_once(self, read_records):
+        conn = self._connect()
+        # BEGIN IMMEDIATE serialises concurrent importers; only the first one sees an empty table.
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM audit_events LIMIT 1").fetchone() is None:
+                self._insert(conn, read_records())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def append(self, entries, durability="flush"):
+        if isinstance(entries, dict): entries = [entries]
+        conn = self._connect()
+        conn.execute(f"PRAGMA synchronous={_SYNCHRONOUS.get(durability, 'NORMAL')}")
+        with conn: self._insert(conn, entries)
+
+    def _insert(self, conn, entries):
+        for entry in entries:
+            cursor = conn.execute(
+                "INSERT INTO audit_events (timestamp, event, input_length, blocked_items) VALUES (?, ?, ?, ?)",
+                (entry.get("timestamp", ""), entry.get("event", ""), entry.get("input_length"), entry.get("blocked_items", 0)))
+            conn.executemany(
+                "INSERT INTO audit_risks (event_id, risk_type, count) VALUES (?, ?, ?)",
+                [(cursor.lastrowid, risk, count) for risk, count in risk_counts(entry).items()])
+
+    def iter_events(self, start=None, end=None, entities=None):
+        clauses, params = ["1"], []
+        if start:
+            clauses.append("e.timestamp >= ?")
+            params.append(start)
+        if end:
+            clauses.append("e.timestamp < ?")
+            params.append(end)
+        if entities:
+            entities = list(entities)
+            clauses.append(f"e.id IN (SELECT event_id FROM audit_risks WHERE risk_type IN ({', '.join('?' * len(entities))}))")
+            params.extend(entities)
+        return self._query_events(" AND ".join(clauses), params)
+
+    def read_since(self, cursor=None, limit=10000):
+        """Up to `limit` events with a row id above `cursor`; returns (events, cursor, restarted)."""
+        conn = self._connect()
+        last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM audit_events").fetchone()[0]
+        restarted = cursor is not None and cursor > last_id
+        start = 0 if cursor is None or restarted else cursor
+        events = list(self._query_events(
+            "e.id IN (SELECT id FROM audit_events WHERE id > ? ORDER BY id LIMIT ?)", (start, limit)))
+        return events, (events[-1]["id"] if events else start), restarted
+
+    def recent_events(self, limit=500):
+        return list(self._query_events(
+            "e.id IN (SELECT id FROM audit_events ORDER BY id DESC LIMIT ?)", (limit,)))
+
+    def _query_events(self, where, params):
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT e.id, e.timestamp, e.event, e.input_length, e.blocked_items, r.risk_type, r.count "
+            f"FROM audit_events e LEFT JOIN audit_risks r ON r.event_id = e.id WHERE {where} ORDER BY e.id", params)
+        current_id, record = None, None
+        for event_id, timestamp, event, input_length, blocked_items, risk_type, count in rows:
+            if event_id != current_id:
+                if record is not None: yield _finish_record(record)
+                current_id = event_id
+                record = {"id": event_id, "timestamp": timestamp, "event": event, "input_length": input_length,
+                          "blocked_items": blocked_items, "risk_counts": {}}
+            if risk_type is not None: record["risk_counts"][risk_type] = count
+        if record is not None: yield _finish_record(record)
+
+def _finish_record(record):
+    counts = record["risk_counts"]
+    record["risk_types"] = list(counts)
+    record["details"] = str(counts)
+    return record
+
+def read_log_file(path):
+    """Read either audit format: a legacy JSON array or JSONL."""
+    with open(path, "rb") as f:
+        head = f.read(64).lstrip()
+    if head.startswith(b"["): return read_legacy_log(path)
+    return list(JsonlAuditStore(path).iter_events())
+
+# BACKGROUND SINK
+DURABILITY_MODES = ("none", "flush", "fsync")
+_STOP = object()
+
+class _FlushRequest:
+    def __init__(self): self.done = threading.Event()
+
+class AuditSink:
+    """Queue + writer thread that batches audit records off the request path."""
+
+    def __init__(self, store, batch_size=100, flush_interval=1.0, durability="flush", max_queue=10000):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}, got {durability!r}")
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        # Records persisted later than this are reported as delayed.
+        self.delay_threshold = 2 * flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._stats = {"submitted": 0, "written": 0, "dropped": 0, "delayed": 0, "batches": 0, "errors": 0}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, entry):
+        accepted = not self._closed
+        if accepted:
+            try: self._queue.put_nowait((time.monotonic(), entry))
+            except queue.Full: accepted = False
+        self._count("submitted" if accepted else "dropped")
+        return accepted
+
+    def flush(self, timeout=None):
+        request = _FlushRequest()
+        self._queue.put(request, timeout=timeout)
+        return request.done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        if self._closed: return
+        self._closed = True
+        try: self._queue.put(_STOP, timeout=timeout)
+        except queue.Full: pass
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock: snapshot = dict(self._stats)
+        snapshot["queued"] = self._queue.qsize()
+        return snapshot
+
+    def _count(self, key, n=1):
+        with self._stats_lock: self._stats[key] += n
+
+    def _run(self):
+        batch, deadline = [], None
+        while True:
+            timeout = self.flush_interval if not batch else max(0.0, deadline - time.monotonic())
+            try: item = self._queue.get(timeout=timeout)
+            except queue.Empty: item = None
+            if item is _STOP:
+                self._write(batch)
+                return
+            if isinstance(item, _FlushRequest):
+                self._write(batch)
+                batch = []
+                item.done.set()
+                continue
+            if item is not None:
+                if not batch: deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+
+    def _write(self, batch):
+        if not batch: return
+        try:
+            self.store.append([entry for _, entry in batch], durability=self.durability)
+        except Exception:
+            self._count("errors")
+            self._count("dropped", len(batch))
+            return
+        now = time.monotonic()
+        delayed = sum(1 for queued_at, _ in batch if now - queued_at > self.delay_threshold)
+        with self._stats_lock:
+            self._stats["written"] += len(batch)
+            self._stats["delayed"] += delayed
+            self._stats["batches"] += 1
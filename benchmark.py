@@ -0,0 +1,303 @@
+import json
+import time
+import random
+import argparse
+
+# HELPERS
+FILLER = ("the quarterly report was reviewed by the board and approved for release "
+          "pending final sign off from legal and the compliance office ").split()
+SAMPLES = ["123-45-6789", "4111-1111-1111-1111", "jane.doe@example.com", "912803456", "A12345678"]
+
+def synthetic_document(size, pii_every=400, seed=7):
+    rng = random.Random(seed)
+    words, length = [], 0
+    while length < size:
+        word = rng.choice(SAMPLES) if rng.randrange(pii_every // 6) == 0 else rng.choice(FILLER)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+# PATTERNS
+def bench_patterns(args):
+    """Per-character scan cost of the separate regex recognizers vs the combined scanner."""
+    from presidio_analyzer import AnalyzerEngine
+    from recognizers import CombinedPatternRecognizer, is_mergeable
+
+    analyzer = AnalyzerEngine()
+    sources = [r for r in analyzer.registry.recognizers if r.supported_language == "en" and is_mergeable(r)]
+    combined = CombinedPatternRecognizer(sources)
+    entities = combined.supported_entities
+    print(f"{len(sources)} regex recognizers merged: {', '.join(r.name for r in sources)}")
+    print(f"{'chars':>10} {'separate ns/char':>18} {'combined ns/char':>18} {'speedup':>8} {'results':>9}")
+    for size in args.sizes:
+        text = synthetic_document(size)
+        separate, before = best_of(lambda: [x for r in sources for x in r.analyze(text, entities, None)], args.repeat)
+        merged, after = best_of(lambda: combined.analyze(text, entities, None), args.repeat)
+        print(f"{size:>10} {separate / size * 1e9:>18.1f} {merged / size * 1e9:>18.1f} "
+              f"{separate / merged:>7.2f}x {len(before):>4}/{len(after):<4}")
+
+# TIERS
+TIER_SAMPLES = [
+    # Written the way prompts are typed: sentence-initial capitals, most without names.
+    "Please reset the password for jane.doe@example.com.",
+    "Card 4111-1111-1111-1111 was declined twice. Retry tomorrow.",
+    "Summarise the attached quarterly numbers in three bullet points.",
+    "My SSN is 123-45-6789 and my passport number is A12345678.",
+    "Rewrite this paragraph so it sounds less formal: We regret to inform you that the order is delayed.",
+    "Translate to French: The meeting moved to 3pm.",
+    "Alice Johnson from Berlin asked for the contract draft.",
+    "Forward the invoice to Mark at the London office.",
+    "Hi Priya, can you check the VPN logs for 10.0.0.12?",
+]
+
+def bench_tiers(args):
+    """Median / p95 latency of the full analyzer vs the tiered one on a mixed prompt set."""
+    from presidio_analyzer import AnalyzerEngine
+    from detection import TieredAnalyzer, _percentile
+
+    entities = ["PERSON", "EMAIL_ADDRESS", "PHONE_NUMBER", "LOCATION", "CREDIT_CARD", "US_SSN", "US_PASSPORT", "IBAN_CODE"]
+    analyzer = AnalyzerEngine()
+    tiered = TieredAnalyzer(analyzer)
+    full, fast, missed = [], [], 0
+    for _ in range(args.repeat):
+        for text in TIER_SAMPLES:
+            started = time.perf_counter()
+            expected = analyzer.analyze(text=text, language="en", entities=entities, score_threshold=0.4)
+            full.append((time.perf_counter() - started) * 1000)
+            started = time.perf_counter()
+            found, _ = tiered.analyze(text, entities, score_threshold=0.4)
+            fast.append((time.perf_counter() - started) * 1000)
+            spans = {(r.entity_type, r.start, r.end) for r in found}
+            missed += sum((r.entity_type, r.start, r.end) not in spans for r in expected)
+    stats = tiered.stats()
+    print(f"{'mode':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'full':>8} {_percentile(full, 0.5):>8.2f} {_percentile(full, 0.95):>8.2f}")
+    print(f"{'tiered':>8} {_percentile(fast, 0.5):>8.2f} {_percentile(fast, 0.95):>8.2f}")
+    print(f"NER ran for {stats['ner_runs']} of {stats['requests']} requests; {missed} results of the full analyzer missed")
+
+# CHUNKS
+CHUNK_WARMUP = 200_000
+
+def bench_chunks(args):
+    """Throughput of chunked analysis on a large document as the worker count grows."""
+    from privacy_engine import ChunkedAnalyzer, TARGET_ENTITIES, SCORE_THRESHOLD
+
+    text = synthetic_document(args.size)
+    print(f"{'workers':>8} {'seconds':>9} {'MB/s':>7} {'results':>8}")
+    for workers in args.workers:
+        chunked = ChunkedAnalyzer(workers=workers)
+        try:
+            chunked.analyze(text[:CHUNK_WARMUP], TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD)  # start workers, load models
+            elapsed, (results, _) = best_of(lambda: chunked.analyze(text, TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD), args.repeat)
+        finally: chunked.close()
+        print(f"{workers:>8} {elapsed:>9.2f} {args.size / elapsed / 1e6:>7.2f} {len(results):>8}")
+
+# BATCH
+def read_texts(path, field):
+    with open(path, encoding="utf-8") as f:
+        return [record[field] for record in map(json.loads, f) if record.get(field)]
+
+def bench_batch(args):
+    """Texts/s of one analyze() per text vs the batched NLP pass, on the texts of a JSONL file."""
+    from detection import TieredAnalyzer
+    from privacy_engine import build_engines, analyze_batch, TARGET_ENTITIES, SCORE_THRESHOLD
+
+    texts = read_texts(args.input, args.field) * args.repeat
+    analyzer, _ = build_engines()
+    tiered = TieredAnalyzer(analyzer)
+    runs = [
+        ("full, per text", lambda: [analyzer.analyze(text=t, language="en", entities=TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD) for t in texts]),
+        ("full, batched", lambda: analyze_batch(analyzer, texts, TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD, batch_size=args.batch_size)),
+        ("tiered, per text", lambda: [tiered.analyze(t, TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD)[0] for t in texts]),
+        ("tiered, batched", lambda: [r for r, _ in tiered.analyze_batch(texts, TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD, batch_size=args.batch_size)]),
+    ]
+    print(f"{len(texts)} texts from {args.input} ({args.field})")
+    print(f"{'mode':>18} {'texts/s':>9} {'results':>8}")
+    for name, run in runs:
+        elapsed, results = best_of(run, 2)
+        print(f"{name:>18} {len(texts) / elapsed:>9.1f} {sum(map(len, results)):>8}")
+
+# MASK CACHE
+def bench_cache(args):
+    """Computed vs cached mask_pii() on the texts of a JSONL file; fails if any cached output differs."""
+    import os
+    import tempfile
+    from gateway_core import GatewayPipeline
+    from mask_cache import MaskCache
+
+    texts = read_texts(args.input, args.field)
+    pipeline = GatewayPipeline()
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline.mask_cache = MaskCache(len(texts), path=os.path.join(tmp, "mask_cache.db"))
+        mask_all = lambda: [(safe_text, vault.values) for safe_text, vault, _ in map(pipeline.mask_pii, texts)]
+        started = time.perf_counter()
+        computed = mask_all()
+        miss = time.perf_counter() - started
+        hit, cached = best_of(mask_all, args.repeat)
+        # A fresh in-memory cache over the same file only finds the entries on disk.
+        pipeline.mask_cache = MaskCache(len(texts), path=pipeline.mask_cache.path)
+        disk, from_disk = best_of(mask_all, 1)
+        stats = pipeline.mask_cache.stats()
+    pipeline.close()
+    mismatches = sum(a != b for a, b in zip(computed, cached)) + sum(a != b for a, b in zip(computed, from_disk))
+    print(f"{len(texts)} texts from {args.input} ({args.field})")
+    print(f"{'pass':>9} {'texts/s':>10}")
+    for name, elapsed in (("computed", miss), ("memory", hit), ("disk", disk)):
+        print(f"{name:>9} {len(texts) / elapsed:>10.1f}")
+    print(f"{stats['disk_hits']} disk hits; {mismatches} cached outputs differ from the computed ones")
+    if mismatches: raise SystemExit(1)
+
+# LLM CONNECTIONS
+def bench_llm(args):
+    """Per-call latency of a shared pooled client vs a new client per call, against the local stub."""
+    import threading
+    from llm_client import LLMClient
+    from llm_stub import make_server
+
+    server = make_server(port=args.port, delay=args.delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = args.base_url or f"http://127.0.0.1:{args.port}/v1"
+    messages = [{"role": "user", "content": "Summarise the note for <PERSON_1>."}]
+    try:
+        shared = LLMClient("stub", base_url, "stub")
+        for _ in range(args.calls): shared.chat(messages)
+        shared.close()
+        fresh = LLMClient("stub", base_url, "stub")
+        for _ in range(args.calls):
+            client = LLMClient("stub", base_url, "stub", metrics=fresh.metrics)
+            client.chat(messages)
+            client.close()
+    finally: server.shutdown()
+    print(f"{'client':>8} {'calls':>6} {'reused':>7} {'p50 new ms':>11} {'p50 reused ms':>14} {'setup ms':>9}")
+    for name, stats in (("shared", shared.metrics.stats()), ("per-call", fresh.metrics.stats())):
+        cells = [stats["p50_ms_new"], stats["p50_ms_reused"], stats["avg_setup_ms"]]
+        cells = [f"{c:.2f}" if c is not None else "-" for c in cells]
+        print(f"{name:>8} {stats['calls']:>6} {stats['reused_connections']:>7} {cells[0]:>11} {cells[1]:>14} {cells[2]:>9}")
+
+# LLM RESILIENCE
+def bench_resilience(args):
+    """Latency percentiles and failures of a plain client vs deadlines + retries + hedging, against a stub that injects slow answers and 503s."""
+    import threading
+    from llm_client import LLMClient, _percentile
+    from llm_resilience import ResilientLLM, CircuitBreaker
+    from llm_stub import make_server
+
+    server = make_server(port=args.port, delay=args.delay, error_rate=args.error_rate, slow_rate=args.slow_rate, slow_delay=args.slow_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+    messages = [{"role": "user", "content": "Summarise the note for <PERSON_1>."}]
+    clients = [
+        ("plain", LLMClient("stub", base_url, "stub")),
+        ("resilient", ResilientLLM(LLMClient("stub", base_url, "stub"), deadline=args.deadline, hedge=True, hedge_quantile=args.hedge_percentile,
+                                   breaker=CircuitBreaker(failures=args.calls))),
+    ]
+    print(f"{'client':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    try:
+        for name, client in clients:
+            latencies, failed = [], 0
+            for _ in range(args.calls):
+                started = time.perf_counter()
+                try: client.chat(messages)
+                except Exception: failed += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+            p50, p95, p99 = (_percentile(latencies, q) for q in (0.5, 0.95, 0.99))
+            print(f"{name:>10} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {failed:>7}")
+            client.close()
+        print("resilient:", clients[1][1].stats())
+    finally: server.shutdown()
+
+# LLM ROUTING
+def bench_routing(args):
+    """p50/p95 of routed calls across stub backends while one of them degrades, vs pinning every call to that backend."""
+    import threading
+    from llm_client import LLMClient, _percentile
+    from llm_resilience import ResilientLLM
+    from llm_router import LLMRouter, Backend
+    from llm_stub import make_server
+
+    servers = [make_server(port=args.port + i, delay=args.delay) for i in range(args.backends)]
+    for server in servers: threading.Thread(target=server.serve_forever, daemon=True).start()
+    make_backend = lambda i: Backend(f"stub-{i}", ResilientLLM(LLMClient("stub", f"http://127.0.0.1:{args.port + i}/v1", "stub"), retries=0))
+    messages = [{"role": "user", "content": "Summarise the note for <PERSON_1>."}]
+    runs = [("routed", LLMRouter([make_backend(i) for i in range(args.backends)])), ("pinned", LLMRouter([make_backend(0)]))]
+    print(f"{'client':>8} {'phase':>9} {'p50 ms':>8} {'p95 ms':>8} {'failed':>7}  calls per backend")
+    try:
+        for name, router in runs:
+            for phase in ("healthy", "degraded"):
+                # Backend 0 slows down and starts failing in the second phase.
+                degraded = phase == "degraded"
+                servers[0].RequestHandlerClass.delay = args.delay + (args.degraded_delay if degraded else 0.0)
+                servers[0].RequestHandlerClass.error_rate = args.degraded_errors if degraded else 0.0
+                before = {b.name: b.calls for b in router.backends}
+                latencies, failed = [], 0
+                for _ in range(args.calls):
+                    started = time.perf_counter()
+                    try: router.chat(messages)
+                    except Exception: failed += 1
+                    latencies.append((time.perf_counter() - started) * 1000)
+                share = " ".join(f"{b.name}={b.calls - before[b.name]}" for b in router.backends)
+                print(f"{name:>8} {phase:>9} {_percentile(latencies, 0.5):>8.1f} {_percentile(latencies, 0.95):>8.1f} {failed:>7}  {share}")
+            router.close()
+    finally:
+        for server in servers: server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gateway micro-benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    patterns = commands.add_parser("patterns", help="Combined regex scanner vs separate recognizers")
+    patterns.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    patterns.add_argument("--repeat", type=int, default=3)
+    patterns.set_defaults(run=bench_patterns)
+    tiers = commands.add_parser("tiers", help="Full analyzer vs tiered detection latency")
+    tiers.add_argument("--repeat", type=int, default=20)
+    tiers.set_defaults(run=bench_tiers)
+    chunks = commands.add_parser("chunks", help="Chunked analysis throughput by worker count")
+    chunks.add_argument("--size", type=int, default=1_000_000)
+    chunks.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    chunks.add_argument("--repeat", type=int, default=2)
+    chunks.set_defaults(run=bench_chunks)
+    batch = commands.add_parser("batch", help="Per-text vs batched NLP analysis on a JSONL workload")
+    batch.add_argument("--input", default="requests.jsonl")
+    batch.add_argument("--field", default="body")
+    batch.add_argument("--batch-size", type=int, default=32)
+    batch.add_argument("--repeat", type=int, default=4, help="Repeat the input texts to lengthen the run")
+    batch.set_defaults(run=bench_batch)
+    cache = commands.add_parser("cache", help="Computed vs cached masking, with an equivalence check")
+    cache.add_argument("--input", default="requests.jsonl")
+    cache.add_argument("--field", default="body")
+    cache.add_argument("--repeat", type=int, default=3)
+    cache.set_defaults(run=bench_cache)
+    llm = commands.add_parser("llm", help="Shared pooled LLM client vs a new client per call")
+    llm.add_argument("--calls", type=int, default=200)
+    llm.add_argument("--port", type=int, default=8090, help="Port for the local stub")
+    llm.add_argument("--delay", type=float, default=0.0, help="Stub response delay in seconds")
+    llm.add_argument("--base-url", help="Measure against this endpoint instead of the stub (e.g. an HTTPS proxy)")
+    llm.set_defaults(run=bench_llm)
+    resilience = commands.add_parser("resilience", help="Plain vs resilient LLM client against a stub with injected faults")
+    resilience.add_argument("--calls", type=int, default=300)
+    resilience.add_argument("--port", type=int, default=8091, help="Port for the local stub")
+    resilience.add_argument("--delay", type=float, default=0.01, help="Normal stub response delay in seconds")
+    resilience.add_argument("--slow-rate", type=float, default=0.05, help="Fraction of answers delayed by --slow-delay")
+    resilience.add_argument("--slow-delay", type=float, default=0.5)
+    resilience.add_argument("--error-rate", type=float, default=0.05, help="Fraction of requests answered with 503")
+    resilience.add_argument("--deadline", type=float, default=5.0)
+    resilience.add_argument("--hedge-percentile", type=float, default=0.9, help="Hedge once a request is slower than this percentile; keep it below 1 - slow rate")
+    resilience.set_defaults(run=bench_resilience)
+    routing = commands.add_parser("routing", help="EWMA routing across stub backends while one degrades")
+    routing.add_argument("--backends", type=int, default=3)
+    routing.add_argument("--calls", type=int, default=300, help="Calls per phase")
+    routing.add_argument("--port", type=int, default=8100, help="First stub port; one port per backend")
+    routing.add_argument("--delay", type=float, default=0.01)
+    routing.add_argument("--degraded-delay", type=float, default=0.2, help="Extra delay of the degraded backend")
+    routing.add_argument("--degraded-errors", type=float, default=0.2, help="Error rate of the degraded backend")
+    routing.set_defaults(run=bench_routing)
+    args = parser.parse_args()
+    args.run(args)
@@ -0,0 +1,158 @@
+import re
+import time
+import threading
+from collections import deque
+
+from presidio_analyzer import EntityRecognizer
+from presidio_analyzer.nlp_engine import NlpArtifacts
+
+# TIERED DETECTION
+# Tier 1 ("pattern") runs every regex / checksum / term-list recognizer against a
+# plain regex tokenization, which is enough for context words to boost scores.
+# Tier 2 ("ner") runs the spaCy pipeline for names and places, and only when the
+# text contains a candidate for them or the policy asks for it.
+NER_ENTITIES = ("PERSON", "LOCATION")
+NER_POLICIES = ("auto", "always")
+LATENCY_WINDOW = 1000
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_WORD = re.compile(r"\b[^\W\d_][^\W\d_'\-]*")
+# Capitalised words that start sentences or greetings far more often than they name anyone.
+COMMON_WORDS = frozenset("""
+a an the this that these those there here i we you he she it they me my our your his her its their
+please hi hello hey dear thanks thank regards best kind sincerely yes no ok okay
+is are was were be been do does did can could would should will shall may might must have has had
+what when where why how who which if then so but and or not also as at by for from in on of to with
+today tomorrow yesterday monday tuesday wednesday thursday friday saturday sunday
+""".split())
+
+_SENTENCE_BREAK = re.compile(r"[.!?:;\n]")
+_ADJACENT = re.compile(r"\.?[ \t]+")
+
+def _capitalised(word):
+    return word[0].isupper() and not word.isupper()
+
+def ner_candidate(text):
+    """True when the text has a capitalised word that looks like a name rather than a sentence start.
+
+    Sentence-initial words ("Summarise ...", "Reset ...") are capitalised anyway, so they only
+    count when the next word is capitalised too ("Alice Johnson ..."). Any capitalised,
+    non-common word in the middle of a sentence counts ("... to Mark at the London office").
+    """
+    words = list(_WORD.finditer(text))
+    for i, match in enumerate(words):
+        word = match.group()
+        if not _capitalised(word) or word.lower() in COMMON_WORDS: continue
+        previous_end = words[i - 1].end() if i else 0
+        if i and not _SENTENCE_BREAK.search(text, previous_end, match.start()): return True
+        following = words[i + 1] if i + 1 < len(words) else None
+        if following is not None and _capitalised(following.group()) and _ADJACENT.fullmatch(text, match.end(), following.start()): return True
+    return False
+
+def light_artifacts(text, nlp_engine, language="en"):
+    """NlpArtifacts from a regex tokenizer: no spaCy pipeline, but enough for context enhancement."""
+    tokens, indices = [], []
+    for match in _TOKEN.finditer(text):
+        tokens.append(match.group())
+        indices.append(match.start())
+    return NlpArtifacts(entities=[], tokens=tokens, tokens_indices=indices, lemmas=[t.lower() for t in tokens],
+                        nlp_engine=nlp_engine, language=language)
+
+def _percentile(samples, q):
+    if not samples: return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class TieredAnalyzer:
+    """Runs an AnalyzerEngine in two tiers so cheap inputs never pay for the NER pipeline."""
+
+    def __init__(self, analyzer, policy="auto", ner_entities=NER_ENTITIES, language="en"):
+        if policy not in NER_POLICIES: raise ValueError(f"Unknown NER policy {policy!r}; expected one of {NER_POLICIES}")
+        self.analyzer = analyzer
+        self.policy = policy
+        self.ner_entities = tuple(ner_entities)
+        self.language = language
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._ner_runs = 0
+        self._latency = {"pattern": deque(maxlen=LATENCY_WINDOW), "ner": deque(maxlen=LATENCY_WINDOW), "total": deque(maxlen=LATENCY_WINDOW)}
+
+    def ner_reason(self, text, entities):
+        """Why the NER tier runs for this text ("policy" / "candidates"), or None to skip it."""
+        if not any(entity in self.ner_entities for entity in entities): return None
+        if self.policy == "always": return "policy"
+        if ner_candidate(text): return "candidates"
+        return None
+
+    def analyze(self, text, entities, score_threshold=None):
+        """Returns (results, report); the report lists each tier that ran with its time and result count."""
+        began = time.perf_counter()
+        results, report = self._pattern_tier(text, entities, score_threshold)
+        ner_entities = [e for e in entities if e in self.ner_entities]
+        reason = self.ner_reason(text, ner_entities)
+        if reason:
+            started = time.perf_counter()
+            found = self.analyzer.analyze(text=text, language=self.language, entities=ner_entities, score_threshold=score_threshold)
+            report["tiers"].append({"tier": "ner", "ms": (time.perf_counter() - started) * 1000, "results": len(found)})
+            report["ner"] = reason
+            results.extend(found)
+
+        report["ms"] = (time.perf_counter() - began) * 1000
+        self._record(report)
+        return EntityRecognizer.remove_duplicates(results), report
+
+    def analyze_batch(self, texts, entities, score_threshold=None, batch_size=32):
+        """analyze() for many texts; the texts that need NER share one batched spaCy pass.
+
+        The batched pass cannot be timed per text, so each text's NER cost in its report is an equal share.
+        """
+        outputs = [self._pattern_tier(text, entities, score_threshold) for text in texts]
+        ner_entities = [e for e in entities if e in self.ner_entities]
+        reasons = [self.ner_reason(text, ner_entities) for text in texts]
+        needs = [i for i, reason in enumerate(reasons) if reason]
+        if needs:
+            started = time.perf_counter()
+            batch = self.analyzer.nlp_engine.process_batch([texts[i] for i in needs], self.language, batch_size=batch_size)
+            found = {i: self.analyzer.analyze(text=texts[i], language=self.language, entities=ner_entities,
+                                              score_threshold=score_threshold, nlp_artifacts=nlp_artifacts)
+                     for i, (_, nlp_artifacts) in zip(needs, batch)}
+            share = (time.perf_counter() - started) * 1000 / len(needs)
+            for i in needs:
+                results, report = outputs[i]
+                report["tiers"].append({"tier": "ner", "ms": share, "results": len(found[i])})
+                report["ner"] = reasons[i]
+                results.extend(found[i])
+        analyzed = []
+        for results, report in outputs:
+            report["ms"] = sum(tier["ms"] for tier in report["tiers"])
+            self._record(report)
+            analyzed.append((EntityRecognizer.remove_duplicates(results), report))
+        return analyzed
+
+    def _pattern_tier(self, text, entities, score_threshold):
+        pattern_entities = [e for e in entities if e not in self.ner_entities]
+        report = {"tiers": [], "ner": "skipped"}
+        if not pattern_entities: return [], report
+        started = time.perf_counter()
+        found = self.analyzer.analyze(
+            text=text, language=self.language, entities=pattern_entities, score_threshold=score_threshold,
+            nlp_artifacts=light_artifacts(text, self.analyzer.nlp_engine, self.language))
+        report["tiers"].append({"tier": "pattern", "ms": (time.perf_counter() - started) * 1000, "results": len(found)})
+        return list(found), report
+
+    def _record(self, report):
+        with self._lock:
+            self._requests += 1
+            self._latency["total"].append(report["ms"])
+            for tier in report["tiers"]:
+                self._latency[tier["tier"]].append(tier["ms"])
+                if tier["tier"] == "ner": self._ner_runs += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "ner_runs": self._ner_runs,
+                "p50_ms": {tier: _percentile(samples, 0.5) for tier, samples in self._latency.items()},
+                "p95_ms": {tier: _percentile(samples, 0.95) for tier, samples in self._latency.items()},
+            }
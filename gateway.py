@@ -1,81 +1,61 @@
 import streamlit as st
 import os
-import json
 import datetime
-from dotenv import load_dotenv
-from groq import Groq
-from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern
-from presidio_anonymizer import AnonymizerEngine
+import tempfile
 import pypdf
 import docx
 import pandas as pd
+from audit_analytics import AuditAggregator, TIME_RANGES, resolve_range, timeline_series
+from audit_export import write_report, date_bounds
+from admission import Busy
+from gateway_core import GatewayPipeline, build_audit_store, build_audit_sink, validate_input, unmask_pii, ask_groq, stream_groq, llm_error_message, stream_unmasked, get_llm_client, get_response_cache, get_admission, single_flight_stats, STREAM_RESPONSES, HISTORY_MAX_MESSAGES
 
 # CONFIGURATION
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_MODEL = "llama-3.3-70b-versatile"
-AUDIT_FILE = "audit_log.json"
+RECENT_EVENTS_SHOWN = 500
 
 @st.cache_resource
-def load_tools():
-    analyzer = AnalyzerEngine()
-    anonymizer = AnonymizerEngine()
-
-    # Custom Detectors
-    ssn_pattern = Pattern(name="ssn_pattern", regex=r"\b\d{3}-\d{2}-\d{4}\b", score=0.9)
-    ssn_recognizer = PatternRecognizer(supported_entity="US_SSN", name="Force_SSN", patterns=[ssn_pattern])
-    analyzer.registry.add_recognizer(ssn_recognizer)
-
-    cc_pattern = Pattern(name="cc_pattern", regex=r"\b\d{4}-\d{4}-\d{4}-\d{4}\b", score=0.9)
-    cc_recognizer = PatternRecognizer(supported_entity="CREDIT_CARD", name="Force_CC", patterns=[cc_pattern])
-    analyzer.registry.add_recognizer(cc_recognizer)
-
-    return analyzer, anonymizer
-
-analyzer, anonymizer = load_tools()
-
-# JARGON 
-def add_jargon_recognizer(analyzer_engine, jargon_list):
-    if not jargon_list: return
-    jargon_recognizer = PatternRecognizer(supported_entity="CUSTOM_JARGON", name="Jargon_List", deny_list=jargon_list)
-    try: analyzer_engine.registry.remove_recognizer("Jargon_List")
-    except: pass
-    analyzer_engine.registry.add_recognizer(jargon_recognizer)
-
-def validate_input(text):
-    if not text: return None, "⚠️ Input is empty."
-    clean_text = text.strip()
-    if len(clean_text) > 10000: return None, "⚠️ Input too long."
-    forbidden = ["ignore previous instructions", "system override"]
-    for phrase in forbidden:
-        if phrase in clean_text.lower(): return None, "Prompt Injection Detected."
-    return clean_text, None
-
-# AUDIT LOGGER 
-def log_audit_event(original_len, secret_map):
-    pii_counts = {}
-    for item in secret_map:
-        pii_counts[item.entity_type] = pii_counts.get(item.entity_type, 0) + 1
-    
-    log_entry = {
-        "timestamp": datetime.datetime.now().isoformat(),
-        "event": "DATA_MASKING",
-        "input_length": original_len,
-        "blocked_items": len(secret_map),
-        "risk_types": list(pii_counts.keys()),
-        "details": str(pii_counts)
-    }
-    
+def load_audit_store():
+    return build_audit_store()
+
+audit_store = load_audit_store()
+
+@st.cache_resource
+def load_audit_sink():
+    return build_audit_sink(audit_store)
+
+audit_sink = load_audit_sink()
+
+@st.cache_resource
+def load_pipeline():
+    return GatewayPipeline(audit_sink=audit_sink)
+
+pipeline = load_pipeline()
+
+@st.cache_resource
+def load_audit_aggregator():
+    return AuditAggregator(audit_store)
+
+# COMPLIANCE EXPORT
+def offer_export_file(start_date, end_date, entities, compress):
+    """Stream the report into a temporary file and offer it for download in this run only.
+
+    The download button takes the file's contents when it is rendered, so the file is removed
+    straight away: later reruns do not re-read it and nothing is left behind in the temp directory.
+    """
+    start, end = date_bounds(start_date, end_date)
+    fd, path = tempfile.mkstemp(suffix=".csv.gz" if compress else ".csv")
     try:
-        if not os.path.exists(AUDIT_FILE):
-            with open(AUDIT_FILE, "w") as f: json.dump([], f)
-        with open(AUDIT_FILE, "r+") as f:
-            try: data = json.load(f)
-            except: data = []
-            data.append(log_entry)
-            f.seek(0)
-            json.dump(data, f, indent=4)
-    except Exception: pass
+        with os.fdopen(fd, "wb") as f:
+            write_report(audit_store, f, start=start, end=end, entities=entities, compress=compress)
+        with open(path, "rb") as report:
+            st.download_button(
+                label="Export Audit Report (CSV)",
+                data=report,
+                file_name=f"compliance_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv{'.gz' if compress else ''}",
+                mime="application/gzip" if compress else "text/csv",
+                use_container_width=True
+            )
+    finally: os.remove(path)
 
 def read_file(uploaded_file):
     text = ""
@@ -90,34 +70,43 @@ def read_file(uploaded_file):
     except Exception as e: return f"Error: {e}"
     return text
 
-def mask_pii(text):
-    target_entities = ["PERSON", "EMAIL_ADDRESS", "PHONE_NUMBER", "LOCATION", "CREDIT_CARD", "US_SSN", "US_PASSPORT", "IBAN_CODE", "CUSTOM_JARGON"]
-    results = analyzer.analyze(text=text, language='en', entities=target_entities, score_threshold=0.4)
-    anonymized_result = anonymizer.anonymize(text=text, analyzer_results=results)
-    log_audit_event(len(text), anonymized_result.items)
-    return anonymized_result.text, anonymized_result.items
-
-def unmask_pii(ai_response, items, original_text):
-    processed_response = ai_response
-    for item in items:
-        placeholder = f"<{item.entity_type}>"
-        real_value = original_text[item.start:item.end]
-        processed_response = processed_response.replace(placeholder, real_value)
-    return processed_response
-
-def ask_groq(safe_text):
-    if not GROQ_API_KEY: return "Key missing in .env"
-    try:
-        client = Groq(api_key=GROQ_API_KEY)
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant. Preserve placeholders like <PERSON> exactly."},
-                {"role": "user", "content": safe_text}
-            ],
-            model=GROQ_MODEL, temperature=0.7,
-        )
-        return chat_completion.choices[0].message.content
-    except Exception as e: return f"Cloud Error: {str(e)}"
+def render_output_header():
+    st.markdown("""
+        <div class='section-header'>
+            <i class="fas fa-shield-check" style='color: #10b981;'></i>
+            <h3>Secured Output</h3>
+        </div>
+    """, unsafe_allow_html=True)
+
+def mask_pii(text, vault=None, conversation=False):
+    # Only the vault id lives in session state; the mapping itself is held by the
+    # pipeline's store, which expires and evicts it under a global memory cap.
+    safe_text, vault, report = pipeline.mask_pii(text, vault)
+    st.session_state.detection_report = report
+    st.session_state.vault_id = pipeline.vaults.put(vault, st.session_state.get("vault_id"), compact=not conversation)
+    return safe_text, vault
+
+def conversation_vault():
+    """The vault of the ongoing conversation, or None to start a new one (also when it has expired)."""
+    vault = pipeline.vaults.get(st.session_state.get("vault_id")) if st.session_state.get("history") else None
+    if vault is None: st.session_state.history = []
+    return vault
+
+def render_history(history, vault):
+    # Only masked messages are kept in session state; they are re-identified for display.
+    for message in history:
+        with st.chat_message(message["role"]): st.markdown(unmask_pii(message["content"], vault))
+
+def collect(chunks, into):
+    for chunk in chunks:
+        into.append(chunk)
+        yield chunk
+
+def backend_summary(name, b):
+    latency = [f"{b['ewma_ms']:.0f} ms"] if b["ewma_ms"] is not None else []
+    if b["ewma_first_token_ms"] is not None: latency.append(f"first token {b['ewma_first_token_ms']:.0f} ms")
+    if not latency: return f"{name} (no calls yet)"
+    return f"{name} {' / '.join(latency)}, {b['error_rate']:.0%} errors, {b['calls']} calls, circuit {b['breaker']}"
 
 def load_premium_css():
     st.markdown("""
@@ -654,8 +643,8 @@ with st.sidebar:
         height=120
     )
     jargon_list = [word.strip() for word in jargon_input.split(",") if word.strip()]
+    pipeline.set_jargon(jargon_list)
     if jargon_list:
-        add_jargon_recognizer(analyzer, jargon_list)
         st.markdown(f"""
             <div class='custom-alert alert-success' style='margin-top: 1rem;'>
                 <i class="fas fa-check-circle" style='color: #10b981;'></i>
@@ -686,6 +675,10 @@ with tab_user:
             label_visibility="collapsed"
         )
         
+        conversation_mode = st.checkbox("Conversation mode", help="Keep the masked history so follow-up questions can refer to earlier turns")
+        if not conversation_mode: st.session_state.history = []
+        elif st.session_state.get("history") and st.button("New conversation"): st.session_state.history = []
+
         user_input = ""
         if input_type == "Text":
             user_input = st.text_area(
@@ -710,30 +703,65 @@ with tab_user:
                 """, unsafe_allow_html=True)
 
         st.markdown("<br>", unsafe_allow_html=True)
-        if st.button("SECURE & PROCESS", use_container_width=True, type="primary"):
+        submitted = st.button("SECURE & PROCESS", use_container_width=True, type="primary")
+        if submitted:
             valid_text, error = validate_input(user_input)
+            if not error:
+                # In conversation mode only the new message is analysed; it is masked into
+                # the conversation's vault so earlier values keep their placeholders.
+                vault = conversation_vault() if conversation_mode else None
+                history = st.session_state.history
+                try: safe_text, vault = mask_pii(valid_text, vault, conversation=conversation_mode)
+                except Busy as e: error = f"⏳ Gateway busy: {e}"
             if error: 
                 st.error(error)
             else:
-                safe_text, secret_map = mask_pii(valid_text)
                 with st.status("Processing through privacy layer...", expanded=True) as status:
-                    ai_answer = ask_groq(safe_text)
+                    if STREAM_RESPONSES:
+                        with col2:
+                            render_output_header()
+                            render_history(history, vault)
+                            output = st.empty()
+                        final_answer, masked_chunks = "", []
+                        try:
+                            for text in stream_unmasked(collect(stream_groq(safe_text, history), masked_chunks), vault):
+                                final_answer += text
+                                output.success(final_answer)
+                            ai_answer = "".join(masked_chunks)
+                        except Exception as e:
+                            ai_answer = llm_error_message(e)
+                            output.empty()
+                    else:
+                        ai_answer = ask_groq(safe_text, history)
                     if "🚨" in ai_answer:
                         st.error(ai_answer)
                         status.update(label="Processing Failed", state="error")
                     else:
-                        final_answer = unmask_pii(ai_answer, secret_map, valid_text)
+                        if not STREAM_RESPONSES: final_answer = unmask_pii(ai_answer, vault)
+                        if conversation_mode:
+                            history += [{"role": "user", "content": safe_text}, {"role": "assistant", "content": ai_answer}]
+                            del history[:-HISTORY_MAX_MESSAGES]
                         status.update(label="Complete", state="complete")
                         with col2:
-                            st.markdown("""
-                                <div class='section-header'>
-                                    <i class="fas fa-shield-check" style='color: #10b981;'></i>
-                                    <h3>Secured Output</h3>
-                                </div>
-                            """, unsafe_allow_html=True)
-                            st.success(final_answer)
+                            if not STREAM_RESPONSES:
+                                render_output_header()
+                                render_history(history[:-2] if conversation_mode else [], vault)
+                                st.success(final_answer)
                             with st.expander("View Anonymized Pipeline"):
                                 st.code(safe_text, language="text")
+                                report = st.session_state.get("detection_report")
+                                if report:
+                                    tiers = " · ".join(f"{t['tier']} {t['ms']:.1f} ms ({t['results']} found)" for t in report["tiers"])
+                                    chunks = f" · {report['chunks']} chunks in {report['ms']:.0f} ms" if "chunks" in report else ""
+                                    if report.get("cached"): st.caption("Detection: reused cached result for identical input")
+                                    else: st.caption(f"Detection: {tiers or 'no tiers'} · NER {report['ner']}{chunks}")
+
+    if conversation_mode and not submitted:
+        vault = conversation_vault()
+        if vault is not None:
+            with col2:
+                render_output_header()
+                render_history(st.session_state.history, vault)
 
 with tab_auditor:
     st.markdown("""
@@ -742,129 +770,167 @@ with tab_auditor:
             <h2 style='margin: 0; font-size: 1.875rem;'>Governance & Compliance Dashboard</h2>
         </div>
     """, unsafe_allow_html=True)
-    
-    if os.path.exists(AUDIT_FILE):
-        with open(AUDIT_FILE, "r") as f:
-            try:
-                data = json.load(f)
-                if data:
-                    df = pd.DataFrame(data)
-                    
+
+    sink_stats = audit_sink.stats()
+    st.caption(f"Audit pipeline: {sink_stats['written']} written · {sink_stats['queued']} queued · {sink_stats['dropped']} dropped · {sink_stats['delayed']} delayed")
+    if pipeline.detector is not None:
+        detector_stats = pipeline.detector.stats()
+        p50 = detector_stats["p50_ms"]["total"]
+        if p50 is not None:
+            st.caption(f"Detection: {detector_stats['requests']} requests · NER ran for {detector_stats['ner_runs']} · median {p50:.1f} ms")
+    llm_stats = get_llm_client().metrics.stats()
+    if llm_stats["calls"]:
+        saved = f" · ~{llm_stats['saved_ms']:.0f} ms connection setup saved" if llm_stats["saved_ms"] is not None else ""
+        first_token = f" · first token p50 {llm_stats['p50_ms_first_token']:.0f} ms" if llm_stats["p50_ms_first_token"] is not None else ""
+        resilience = get_llm_client().stats()
+        if resilience["retries"] or resilience["hedged"] or resilience["failovers"] or resilience["breaker"] != "closed":
+            st.caption(f"LLM resilience: circuit {resilience['breaker']} ({resilience['breaker_trips']} trips) · {resilience['retries']} retries · {resilience['timeouts']} timeouts · {resilience['hedged']} hedged ({resilience['hedge_wins']} won) · {resilience['rejected_fast']} failed fast · {resilience['failovers']} failovers")
+        if len(resilience["backends"]) > 1:
+            st.caption("LLM backends: " + " · ".join(
+                backend_summary(name, b) for name, b in resilience["backends"].items()))
+        flights = single_flight_stats()
+        shared = f" · {flights['shared']} requests shared an identical in-flight call" if flights["shared"] else ""
+        st.caption(f"LLM: {llm_stats['calls']} calls · {llm_stats['reused_connections']} on reused connections · {llm_stats['errors']} errors{saved}{first_token}{shared}")
+    admission = get_admission().stats()
+    cpu, llm_bucket = admission["cpu"], admission["llm"]
+    if cpu["admitted"] or sum(cpu["rejected"].values()):
+        wait = f" · p95 wait {cpu['p95_wait_ms']:.0f} ms" if cpu["p95_wait_ms"] is not None else ""
+        st.caption(f"Admission: analysis {cpu['active']}/{cpu['limit']} busy · {cpu['waiting']} queued (max {cpu['max_waiting']}){wait} · {sum(cpu['rejected'].values())} turned away")
+    if llm_bucket is not None and llm_bucket["admitted"]:
+        st.caption(f"LLM rate limit: {llm_bucket['rate']:g}/s · {llm_bucket['waiting']} queued · p95 wait {llm_bucket['p95_wait_ms']:.0f} ms · {sum(llm_bucket['rejected'].values())} turned away")
+    response_cache = get_response_cache()
+    if response_cache is not None:
+        cache_stats = response_cache.stats()
+        st.caption(f"LLM response cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['entries']} entries · {cache_stats['expired']} expired · {cache_stats['evicted']} evicted")
+    if pipeline.mask_cache is not None:
+        cache_stats = pipeline.mask_cache.stats()
+        st.caption(f"Mask cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits · {cache_stats['misses']} misses · {cache_stats['entries']}/{cache_stats['max_entries']} entries · {cache_stats['evicted']} evicted")
+    vault_stats = pipeline.vaults.stats()
+    st.caption(f"Vaults: {vault_stats['vaults']} live · {vault_stats['bytes'] / 1024:.0f} KB of {vault_stats['max_bytes'] / 1024 / 1024:.0f} MB · {vault_stats['expired']} expired · {vault_stats['evicted']} evicted")
+    
+    if audit_store.exists():
+        try:
+            aggregator = load_audit_aggregator().refresh()
+            summary = aggregator.snapshot()
+            if summary["operations"]:
+                
+                st.markdown("""
+                    <div style='margin-bottom: 1rem;'>
+                        <h3 style='font-size: 1.125rem; color: #6b7280; font-weight: 600; text-transform: uppercase; letter-spacing: 0.5px;'>
+                            Real-Time Intelligence
+                        </h3>
+                    </div>
+                """, unsafe_allow_html=True)
+                
+                m1, m2, m3 = st.columns(3)
+                
+                with m1:
                     st.markdown("""
-                        <div style='margin-bottom: 1rem;'>
-                            <h3 style='font-size: 1.125rem; color: #6b7280; font-weight: 600; text-transform: uppercase; letter-spacing: 0.5px;'>
-                                Real-Time Intelligence
-                            </h3>
+                        <div class='metric-card'>
+                            <i class="fas fa-server" style='color: #6366f1;'></i>
                         </div>
                     """, unsafe_allow_html=True)
-                    
-                    m1, m2, m3 = st.columns(3)
-                    
-                    with m1:
-                        st.markdown("""
-                            <div class='metric-card'>
-                                <i class="fas fa-server" style='color: #6366f1;'></i>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        st.metric("Total Operations", len(df))
-                    
-                    with m2:
-                        st.markdown("""
-                            <div class='metric-card'>
-                                <i class="fas fa-shield-halved" style='color: #10b981;'></i>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        st.metric("PII Instances Blocked", df["blocked_items"].sum())
-                    
-                    with m3:
-                        all_risks = []
-                        for risks in df["risk_types"]:
-                            all_risks.extend(risks)
-                        most_common = max(set(all_risks), key=all_risks.count) if all_risks else "None"
-                        st.markdown("""
-                            <div class='metric-card'>
-                                <i class="fas fa-triangle-exclamation" style='color: #f59e0b;'></i>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        st.metric("Primary Threat Vector", most_common)
-                    
-                    st.markdown("<br><br>", unsafe_allow_html=True)
-
+                    st.metric("Total Operations", summary["operations"])
+                
+                with m2:
                     st.markdown("""
-                        <div style='margin-bottom: 1rem; margin-top: 2rem;'>
-                            <h3 style='font-size: 1.125rem; color: #6b7280; font-weight: 600; text-transform: uppercase; letter-spacing: 0.5px;'>
-                                Activity Analytics
-                            </h3>
+                        <div class='metric-card'>
+                            <i class="fas fa-shield-halved" style='color: #10b981;'></i>
                         </div>
                     """, unsafe_allow_html=True)
-                    
-                    c1, c2 = st.columns(2, gap="large")
-                    with c1:
-                        st.markdown("""
-                            <div style='display: flex; align-items: center; gap: 0.5rem; margin-bottom: 1rem;'>
-                                <i class="fas fa-chart-area" style='color: #6366f1; font-size: 1rem;'></i>
-                                <h4 style='margin: 0; font-size: 1rem; font-weight: 600; color: #374151;'>Protection Activity Timeline</h4>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        st.line_chart(df["blocked_items"], use_container_width=True)
-                    
-                    with c2:
-                        st.markdown("""
-                            <div style='display: flex; align-items: center; gap: 0.5rem; margin-bottom: 1rem;'>
-                                <i class="fas fa-chart-column" style='color: #6366f1; font-size: 1rem;'></i>
-                                <h4 style='margin: 0; font-size: 1rem; font-weight: 600; color: #374151;'>Threat Distribution Analysis</h4>
-                            </div>
-                        """, unsafe_allow_html=True)
-                        if all_risks:
-                            risk_counts = pd.Series(all_risks).value_counts()
-                            st.bar_chart(risk_counts, use_container_width=True)
-                        else:
-                            st.markdown("""
-                                <div class='custom-alert alert-info'>
-                                    <i class="fas fa-info-circle"></i>
-                                    <span>No threats detected in current dataset</span>
-                                </div>
-                            """, unsafe_allow_html=True)
-
-                    st.markdown("<br><br>", unsafe_allow_html=True)
-
-                    # Export Section
+                    st.metric("PII Instances Blocked", summary["blocked"])
+                
+                with m3:
                     st.markdown("""
-                        <div style='margin-bottom: 1.5rem; margin-top: 2rem;'>
-                            <h3 style='font-size: 1.125rem; color: #6b7280; font-weight: 600; text-transform: uppercase; letter-spacing: 0.5px;'>
-                                Compliance Reporting
-                            </h3>
+                        <div class='metric-card'>
+                            <i class="fas fa-triangle-exclamation" style='color: #f59e0b;'></i>
                         </div>
                     """, unsafe_allow_html=True)
-                    
-                    csv = df.to_csv(index=False).encode('utf-8')
-                    
-                    col_export1, col_export2 = st.columns([2, 1])
-                    with col_export1:
-                        st.download_button(
-                            label="Export Audit Report (CSV)",
-                            data=csv,
-                            file_name=f"compliance_report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                            mime="text/csv",
-                            use_container_width=True
-                        )
-                    
-                    st.markdown("<br>", unsafe_allow_html=True)
-                    st.dataframe(df, use_container_width=True, height=400)
-                else:
+                    st.metric("Primary Threat Vector", summary["primary_threat"])
+                
+                st.markdown("<br><br>", unsafe_allow_html=True)
+
+                st.markdown("""
+                    <div style='margin-bottom: 1rem; margin-top: 2rem;'>
+                        <h3 style='font-size: 1.125rem; color: #6b7280; font-weight: 600; text-transform: uppercase; letter-spacing: 0.5px;'>
+                            Activity Analytics
+                        </h3>
+                    </div>
+                """, unsafe_allow_html=True)
+                
+                time_range = st.selectbox("Time Range:", list(TIME_RANGES), index=2)
+                since, resolution = resolve_range(time_range)
+                c1, c2 = st.columns(2, gap="large")
+                with c1:
                     st.markdown("""
-                        <div class='custom-alert alert-info'>
-                            <i class="fas fa-inbox"></i>
-                            <span>Audit log initialized. Process data to generate reports.</span>
+                        <div style='display: flex; align-items: center; gap: 0.5rem; margin-bottom: 1rem;'>
+                            <i class="fas fa-chart-area" style='color: #6366f1; font-size: 1rem;'></i>
+                            <h4 style='margin: 0; font-size: 1rem; font-weight: 600; color: #374151;'>Protection Activity Timeline</h4>
                         </div>
                     """, unsafe_allow_html=True)
-            except Exception as e:
-                st.markdown(f"""
-                    <div class='custom-alert alert-error'>
-                        <i class="fas fa-exclamation-triangle"></i>
-                        <span>Error loading audit data: {e}</span>
+                    st.line_chart(timeline_series(aggregator, time_range), use_container_width=True)
+                    st.caption(f"{resolution.capitalize()} resolution")
+                
+                with c2:
+                    st.markdown("""
+                        <div style='display: flex; align-items: center; gap: 0.5rem; margin-bottom: 1rem;'>
+                            <i class="fas fa-chart-column" style='color: #6366f1; font-size: 1rem;'></i>
+                            <h4 style='margin: 0; font-size: 1rem; font-weight: 600; color: #374151;'>Threat Distribution Analysis</h4>
+                        </div>
+                    """, unsafe_allow_html=True)
+                    range_risks = aggregator.entity_counts(resolution, since)
+                    if range_risks:
+                        risk_counts = pd.Series(range_risks).sort_values(ascending=False)
+                        st.bar_chart(risk_counts, use_container_width=True)
+                    else:
+                        st.markdown("""
+                            <div class='custom-alert alert-info'>
+                                <i class="fas fa-info-circle"></i>
+                                <span>No threats detected in current dataset</span>
+                            </div>
+                        """, unsafe_allow_html=True)
+
+                st.markdown("<br><br>", unsafe_allow_html=True)
+
+                # Export Section
+                st.markdown("""
+                    <div style='margin-bottom: 1.5rem; margin-top: 2rem;'>
+                        <h3 style='font-size: 1.125rem; color: #6b7280; font-weight: 600; text-transform: uppercase; letter-spacing: 0.5px;'>
+                            Compliance Reporting
+                        </h3>
+                    </div>
+                """, unsafe_allow_html=True)
+                
+                col_export1, col_export2 = st.columns([2, 1])
+                with col_export1:
+                    with st.form("export_form"):
+                        export_dates = st.date_input("Date Range:", value=(), help="Leave empty to export the full history")
+                        export_entities = st.multiselect("Entity Types:", sorted(summary["risk_types"]), help="Leave empty to include every event")
+                        export_compress = st.checkbox("Compress (gzip)")
+                        export_requested = st.form_submit_button("Prepare Audit Report", use_container_width=True)
+
+                    # Download buttons are not allowed inside a form, so the report is offered just below it.
+                    if export_requested:
+                        start_date = export_dates[0] if len(export_dates) > 0 else None
+                        end_date = export_dates[1] if len(export_dates) > 1 else start_date
+                        offer_export_file(start_date, end_date, export_entities, export_compress)
+                
+                st.markdown("<br>", unsafe_allow_html=True)
+                st.dataframe(pd.DataFrame(audit_store.recent_events(RECENT_EVENTS_SHOWN)), use_container_width=True, height=400)
+            else:
+                st.markdown("""
+                    <div class='custom-alert alert-info'>
+                        <i class="fas fa-inbox"></i>
+                        <span>Audit log initialized. Process data to generate reports.</span>
                     </div>
                 """, unsafe_allow_html=True)
+        except Exception as e:
+            st.markdown(f"""
+                <div class='custom-alert alert-error'>
+                    <i class="fas fa-exclamation-triangle"></i>
+                    <span>Error loading audit data: {e}</span>
+                </div>
+            """, unsafe_allow_html=True)
     else:
         st.markdown("""
             <div class='custom-alert alert-info'>
@@ -0,0 +1,110 @@
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from detection import _percentile
+from admission import Busy
+from gateway_core import GatewayPipeline, build_audit_store, build_audit_sink, validate_input, unmask_pii, ask_groq, is_llm_error
+
+# HEADLESS BATCH MODE
+# Streams a JSONL file of requests through validate -> mask -> LLM -> unmask
+# without Streamlit. At most `max_pending` requests are read ahead of the
+# writer, so memory stays bounded however large the input is.
+STAGES = ("total", "mask", "llm")
+
+def read_requests(f):
+    for line_no, line in enumerate(f, 1):
+        if not line.strip(): continue
+        try: record = json.loads(line)
+        except json.JSONDecodeError as e: record = {"_invalid": str(e)}
+        yield line_no, record
+
+def process_request(pipeline, line_no, record, field, id_field, mask_only):
+    began = time.perf_counter()
+    timings = {}
+    result = {"line": line_no}
+    if not isinstance(record, dict): return dict(result, status="error", error=f"Expected a JSON object, got {type(record).__name__}"), timings
+    if id_field in record: result[id_field] = record[id_field]
+    if "_invalid" in record: return dict(result, status="error", error=f"Invalid JSON: {record['_invalid']}"), timings
+    text = record.get(field)
+    valid_text, error = validate_input(text if isinstance(text, str) else "")
+    if error: return dict(result, status="rejected", error=error), timings
+
+    try:
+        started = time.perf_counter()
+        safe_text, vault, _ = pipeline.mask_pii(valid_text)
+        timings["mask"] = time.perf_counter() - started
+        # blocked_items counts detections, as in the audit log; distinct_items counts the placeholders they became.
+        result.update(masked=safe_text, blocked_items=vault.masked, distinct_items=len(vault), status="ok")
+        if not mask_only:
+            started = time.perf_counter()
+            ai_answer = ask_groq(safe_text)
+            timings["llm"] = time.perf_counter() - started
+            if is_llm_error(ai_answer): result.update(status="error", error=ai_answer)
+            else: result["response"] = unmask_pii(ai_answer, vault)
+    except Busy as e: result.update(status="busy", error=str(e))
+    except Exception as e: result.update(status="error", error=f"{type(e).__name__}: {e}")
+    timings["total"] = time.perf_counter() - began
+    return result, timings
+
+def run_ordered(tasks, worker, workers, max_pending):
+    """Yield worker(*task) for each task, in input order, with at most `max_pending` in flight."""
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for task in tasks:
+            if len(pending) >= max_pending: yield pending.popleft().result()
+            pending.append(pool.submit(worker, *task))
+        while pending: yield pending.popleft().result()
+
+def print_summary(statuses, latencies, elapsed, out=sys.stderr):
+    total = sum(statuses.values())
+    print(f"Processed {total} requests in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.1f} req/s): "
+          + ", ".join(f"{count} {status}" for status, count in sorted(statuses.items())), file=out)
+    print(f"{'stage':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}", file=out)
+    for stage in STAGES:
+        samples = latencies[stage]
+        if not samples: continue
+        p50, p90, p99 = (_percentile(samples, q) * 1000 for q in (0.5, 0.9, 0.99))
+        print(f"{stage:>6} {p50:>9.1f} {p90:>9.1f} {p99:>9.1f} {max(samples) * 1000:>9.1f}", file=out)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSONL file of requests through the privacy gateway without the web UI.")
+    parser.add_argument("input", help="JSONL requests, one object per line ('-' for stdin)")
+    parser.add_argument("output", help="JSONL results in input order ('-' for stdout)")
+    parser.add_argument("--field", default="body", help="Field holding the text to process (default: body)")
+    parser.add_argument("--id-field", default="request_id", help="Field copied to the result to identify it (default: request_id)")
+    parser.add_argument("--workers", type=int, default=4, help="Requests processed concurrently")
+    parser.add_argument("--max-pending", type=int, help="Requests read ahead of the writer (default: 4 x workers)")
+    parser.add_argument("--jargon", default="", help="Comma-separated protected terms")
+    parser.add_argument("--mask-only", action="store_true", help="Skip the LLM call and only write masked text")
+    parser.add_argument("--no-audit", action="store_true", help="Do not write audit records")
+    args = parser.parse_args(argv)
+
+    audit_sink = None if args.no_audit else build_audit_sink(build_audit_store())
+    pipeline = GatewayPipeline(audit_sink=audit_sink)
+    pipeline.set_jargon([word.strip() for word in args.jargon.split(",") if word.strip()])
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    statuses, latencies = {}, {stage: [] for stage in STAGES}
+    began = time.perf_counter()
+    try:
+        tasks = ((line_no, record, args.field, args.id_field, args.mask_only) for line_no, record in read_requests(source))
+        worker = lambda *task: process_request(pipeline, *task)
+        for result, timings in run_ordered(tasks, worker, args.workers, args.max_pending or 4 * args.workers):
+            sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+            for stage, seconds in timings.items(): latencies[stage].append(seconds)
+    finally:
+        if source is not sys.stdin: source.close()
+        if sink is not sys.stdout: sink.close()
+        pipeline.close()
+        if audit_sink is not None: audit_sink.close()
+    print_summary(statuses, latencies, time.perf_counter() - began)
+    return 1 if statuses.get("error") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+import os
+import json
+import contextlib
+import datetime
+import threading
+from dotenv import load_dotenv
+from audit_store import SqliteAuditStore, AuditSink
+from audit_archive import RotatingAuditStore
+from llm_client import LLMClient, LLMMetrics
+from llm_resilience import ResilientLLM, CircuitBreaker, LLMError
+from llm_router import LLMRouter, Backend
+from llm_cache import ResponseCache, response_key
+from single_flight import SingleFlight, AsyncSingleFlight
+from admission import AdmissionController, Busy
+from presidio_anonymizer.entities import OperatorConfig
+from reidentify import StreamingUnmasker
+from vault import PlaceholderVault, VaultStore, Span
+from mask_cache import MaskCache, cache_key
+from detection import TieredAnalyzer
+from privacy_engine import build_engines, add_jargon_recognizer, jargon_terms, jargon_fingerprint, analyze_batch, ChunkedAnalyzer, TARGET_ENTITIES, SCORE_THRESHOLD
+
+# CONFIGURATION
+load_dotenv()
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "")
+LLM_ROUTE_ALPHA = float(os.getenv("LLM_ROUTE_ALPHA", "0.2"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "30"))
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.25"))
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+LLM_TEMPERATURE = 0.7
+LLM_RATE_PER_SECOND = float(os.getenv("LLM_RATE_PER_SECOND", "0"))
+LLM_RATE_BURST = int(os.getenv("LLM_RATE_BURST", "10"))
+ADMISSION_CPU_LIMIT = int(os.getenv("ADMISSION_CPU_LIMIT", "0")) or os.cpu_count() or 4
+ADMISSION_QUEUE = int(os.getenv("ADMISSION_QUEUE", "64"))
+ADMISSION_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_TIMEOUT_SECONDS", "10"))
+LLM_CACHE = os.getenv("LLM_CACHE", "0") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "24"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") == "1"
+COMBINED_PATTERNS = os.getenv("COMBINED_PATTERNS", "1") == "1"
+TIERED_DETECTION = os.getenv("TIERED_DETECTION", "1") == "1"
+NER_POLICY = os.getenv("NER_POLICY", "auto")
+CHUNKED_ANALYSIS = os.getenv("CHUNKED_ANALYSIS", "1") == "1"
+CHUNK_THRESHOLD = 10000
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "0"))
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "32"))
+MASK_CACHE_ENTRIES = int(os.getenv("MASK_CACHE_ENTRIES", "1024"))
+MASK_CACHE_PATH = os.getenv("MASK_CACHE_PATH", "")
+HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "20"))
+VAULT_TTL_SECONDS = float(os.getenv("VAULT_TTL_SECONDS", "1800"))
+VAULT_MAX_MB = float(os.getenv("VAULT_MAX_MB", "64"))
+MAX_INPUT_CHARS = int(os.getenv("MAX_INPUT_CHARS", "2000000")) if CHUNKED_ANALYSIS else CHUNK_THRESHOLD
+AUDIT_FILE = "audit_log.jsonl"
+LEGACY_AUDIT_FILE = "audit_log.json"
+AUDIT_DB = "audit_log.db"
+AUDIT_BACKEND = os.getenv("AUDIT_BACKEND", "jsonl")
+AUDIT_ARCHIVE_DIR = "audit_archive"
+AUDIT_ROTATE_MB = float(os.getenv("AUDIT_ROTATE_MB", "64"))
+AUDIT_ROTATE_HOURS = float(os.getenv("AUDIT_ROTATE_HOURS", "24"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_DURABILITY = os.getenv("AUDIT_DURABILITY", "flush")
+
+# AUDIT
+def build_audit_store():
+    if AUDIT_BACKEND == "sqlite":
+        # A new database imports the whole JSONL history (archived, sealed and active segments), or else the legacy file.
+        history = [] if os.path.exists(AUDIT_DB) else [RotatingAuditStore(AUDIT_FILE, AUDIT_ARCHIVE_DIR)]
+        return SqliteAuditStore(AUDIT_DB, import_paths=[LEGACY_AUDIT_FILE], import_stores=history)
+    return RotatingAuditStore(
+        AUDIT_FILE, AUDIT_ARCHIVE_DIR,
+        max_bytes=int(AUDIT_ROTATE_MB * 1024 * 1024),
+        max_age=datetime.timedelta(hours=AUDIT_ROTATE_HOURS),
+        legacy_path=LEGACY_AUDIT_FILE,
+    )
+
+def build_audit_sink(store):
+    return AuditSink(store, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL, durability=AUDIT_DURABILITY)
+
+def audit_entry(original_len, secret_map):
+    pii_counts = {}
+    for item in secret_map:
+        pii_counts[item.entity_type] = pii_counts.get(item.entity_type, 0) + 1
+
+    return {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "event": "DATA_MASKING",
+        "input_length": original_len,
+        "blocked_items": len(secret_map),
+        "risk_types": list(pii_counts.keys()),
+        "risk_counts": pii_counts,
+        "details": str(pii_counts)
+    }
+
+# PIPELINE
+def validate_input(text, max_chars=MAX_INPUT_CHARS):
+    if not text: return None, "⚠️ Input is empty."
+    clean_text = text.strip()
+    if len(clean_text) > max_chars: return None, "⚠️ Input too long."
+    forbidden = ["ignore previous instructions", "system override"]
+    for phrase in forbidden:
+        if phrase in clean_text.lower(): return None, "Prompt Injection Detected."
+    return clean_text, None
+
+def unmask_pii(ai_response, vault):
+    return vault.unmask(ai_response)
+
+# LLM
+SYSTEM_PROMPT = "You are a helpful assistant. Preserve placeholders like <PERSON_1> exactly."
+
+def llm_backends():
+    """Backend definitions from LLM_BACKENDS (a JSON list), or the single GROQ_MODEL backend at LLM_BASE_URL.
+
+    Each entry: {"name", "model", "base_url", "api_key_env"}; only "model" is required.
+    Backends without an API key are left out.
+    """
+    if not LLM_BACKENDS: return [{"name": GROQ_MODEL, "model": GROQ_MODEL, "base_url": LLM_BASE_URL, "api_key": GROQ_API_KEY}] if GROQ_API_KEY else []
+    backends = []
+    for spec in json.loads(LLM_BACKENDS):
+        api_key = os.getenv(spec.get("api_key_env", "GROQ_API_KEY"))
+        if api_key: backends.append({"name": spec.get("name", spec["model"]), "model": spec["model"], "base_url": spec.get("base_url", LLM_BASE_URL), "api_key": api_key})
+    return backends
+
+BACKENDS = llm_backends()
+_admission = None
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client():
+    """The process-wide LLM router; its connection pools and circuit breakers are shared by every session and thread."""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            metrics = LLMMetrics()
+            backends = []
+            for spec in BACKENDS or [{"name": GROQ_MODEL, "model": GROQ_MODEL, "base_url": LLM_BASE_URL, "api_key": ""}]:
+                client = LLMClient(
+                    spec["api_key"], spec["base_url"], spec["model"],
+                    max_connections=LLM_MAX_CONNECTIONS, max_keepalive=LLM_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_SECONDS, connect_timeout=LLM_CONNECT_TIMEOUT, read_timeout=LLM_READ_TIMEOUT,
+                    metrics=metrics,
+                )
+                llm = ResilientLLM(
+                    client, deadline=LLM_DEADLINE_SECONDS, retries=LLM_RETRIES, backoff=LLM_RETRY_BACKOFF,
+                    hedge=LLM_HEDGE, hedge_quantile=LLM_HEDGE_PERCENTILE,
+                    breaker=CircuitBreaker(failures=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET_SECONDS),
+                )
+                backends.append(Backend(spec["name"], llm, alpha=LLM_ROUTE_ALPHA))
+            _llm_client = LLMRouter(backends, metrics=metrics)
+        return _llm_client
+
+def get_admission():
+    """The process-wide admission controller: CPU-stage slots and the upstream token bucket."""
+    global _admission
+    with _llm_client_lock:
+        if _admission is None:
+            _admission = AdmissionController(ADMISSION_CPU_LIMIT, max_queue=ADMISSION_QUEUE, timeout=ADMISSION_TIMEOUT_SECONDS,
+                                             llm_rate=LLM_RATE_PER_SECOND, llm_burst=LLM_RATE_BURST)
+        return _admission
+
+_response_cache = None
+
+def get_response_cache():
+    """The shared cache of masked completions, or None unless LLM_CACHE=1."""
+    global _response_cache
+    if not LLM_CACHE: return None
+    with _llm_client_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(LLM_CACHE_PATH, ttl=LLM_CACHE_TTL_HOURS * 3600, max_entries=LLM_CACHE_MAX_ENTRIES)
+        return _response_cache
+
+def request_key(messages):
+    """Identifies an upstream request: equal keys are answered from the cache and share in-flight calls."""
+    # Any backend may answer, so the key names all of them rather than the one that happens to be picked.
+    return response_key(" ".join(b["base_url"] for b in BACKENDS), " ".join(b["model"] for b in BACKENDS), LLM_TEMPERATURE, messages)
+
+def _cached(key):
+    cache = get_response_cache()
+    return cache.get(key) if cache is not None else None
+
+def _remember(key, answer):
+    cache = get_response_cache()
+    if cache is not None: cache.put(key, answer)
+    return answer
+
+# Identical masked requests that are in flight at the same time share one upstream call
+# (threads for the UI and CLI, the event loop for the HTTP API). Each caller still
+# re-identifies the shared answer with its own vault.
+_flights = SingleFlight()
+_async_flights = AsyncSingleFlight()
+
+def single_flight_stats():
+    sync, async_ = _flights.stats(), _async_flights.stats()
+    return {name: sync[name] + async_[name] for name in sync}
+
+def chat_messages(safe_text, history=()):
+    """`history` is the conversation so far as masked {"role", "content"} messages; only the most recent are sent."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        *history[-HISTORY_MAX_MESSAGES:],
+        {"role": "user", "content": safe_text}
+    ]
+
+def llm_error_message(error):
+    if isinstance(error, Busy): return f"🚨 Gateway busy: {error}"
+    return f"🚨 Cloud Error: {error}"
+
+def _chat(key, messages):
+    get_admission().before_llm_call()
+    return _remember(key, get_llm_client().chat(messages, temperature=LLM_TEMPERATURE))
+
+def complete(safe_text, history=()):
+    """The masked completion; failures raise LLMError (LLMTimeout, LLMUnavailable, LLMRejected, CircuitOpen) or Busy."""
+    if not BACKENDS: raise LLMError("Key missing in .env")
+    messages = chat_messages(safe_text, history)
+    key = request_key(messages)
+    answer = _cached(key)
+    if answer is not None: return answer
+    return _flights.do(key, lambda: _chat(key, messages))
+
+async def _achat(key, messages):
+    await get_admission().before_llm_call_async()
+    return _remember(key, await get_llm_client().achat(messages, temperature=LLM_TEMPERATURE))
+
+async def acomplete(safe_text, history=()):
+    if not BACKENDS: raise LLMError("Key missing in .env")
+    messages = chat_messages(safe_text, history)
+    key = request_key(messages)
+    answer = _cached(key)
+    if answer is not None: return answer
+    return await _async_flights.do(key, lambda: _achat(key, messages))
+
+def ask_groq(safe_text, history=()):
+    try: return complete(safe_text, history)
+    except Exception as e: return llm_error_message(e)
+
+async def ask_groq_async(safe_text, history=()):
+    try: return await acomplete(safe_text, history)
+    except Exception as e: return llm_error_message(e)
+
+def _stream_chat(key, messages):
+    get_admission().before_llm_call()
+    chunks = []
+    for chunk in get_llm_client().stream_chat(messages, temperature=LLM_TEMPERATURE):
+        chunks.append(chunk)
+        yield chunk
+    # Only a stream that ran to completion is cached.
+    _remember(key, "".join(chunks))
+
+def stream_groq(safe_text, history=()):
+    """Yield the completion in chunks as they arrive; failures raise instead of returning an error string."""
+    if not BACKENDS: raise LLMError("Key missing in .env")
+    messages = chat_messages(safe_text, history)
+    key = request_key(messages)
+    answer = _cached(key)
+    if answer is not None:
+        yield answer
+        return
+    yield from _flights.stream(key, lambda: _stream_chat(key, messages))
+
+def stream_unmasked(chunks, vault):
+    """Re-identify a streamed response chunk by chunk; placeholders split across chunks are held until complete."""
+    unmasker = StreamingUnmasker(vault.values)
+    for chunk in chunks:
+        text = unmasker.feed(chunk)
+        if text: yield text
+    tail = unmasker.flush()
+    if tail: yield tail
+
+def is_llm_error(answer):
+    return answer.startswith("🚨")
+
+class GatewayPipeline:
+    """Detection, anonymization and audit logging, shared by the Streamlit app and the headless entry points."""
+
+    def __init__(self, audit_sink=None, admission=None):
+        self.analyzer, self.anonymizer = build_engines(combined_patterns=COMBINED_PATTERNS)
+        self.admission = admission or get_admission()
+        self.detector = TieredAnalyzer(self.analyzer, policy=NER_POLICY) if TIERED_DETECTION else None
+        self.audit_sink = audit_sink
+        self.vaults = VaultStore(ttl=VAULT_TTL_SECONDS, max_bytes=int(VAULT_MAX_MB * 1024 * 1024))
+        self.mask_cache = MaskCache(MASK_CACHE_ENTRIES, path=MASK_CACHE_PATH or None) if MASK_CACHE_ENTRIES > 0 else None
+        # Everything besides the text, entities, threshold and jargon that changes what is detected.
+        self._cache_config = f"combined={COMBINED_PATTERNS};tiered={TIERED_DETECTION};ner={NER_POLICY};chunked={CHUNKED_ANALYSIS}"
+        self._chunked = None
+        self._chunked_lock = threading.Lock()
+
+    def set_jargon(self, jargon_list):
+        add_jargon_recognizer(self.analyzer, jargon_list)
+
+    def chunked_analyzer(self):
+        # The worker pool is only started by the first document that needs it.
+        with self._chunked_lock:
+            if self._chunked is None:
+                self._chunked = ChunkedAnalyzer(workers=CHUNK_WORKERS, combined_patterns=COMBINED_PATTERNS, tiered=TIERED_DETECTION, ner_policy=NER_POLICY)
+            return self._chunked
+
+    def needs_chunking(self, text):
+        return CHUNKED_ANALYSIS and len(text) > CHUNK_THRESHOLD
+
+    def analyze(self, text):
+        """Returns (results, report); report is None when the full analyzer ran in-process."""
+        if self.needs_chunking(text):
+            return self.chunked_analyzer().analyze(text, TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD, jargon=jargon_terms(self.analyzer))
+        if self.detector is not None:
+            return self.detector.analyze(text, TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD)
+        return self.analyzer.analyze(text=text, language='en', entities=TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD), None
+
+    def mask_pii(self, text, vault=None):
+        """Returns (safe_text, vault, report).
+
+        Pass the vault of an ongoing conversation to mask a new message into it:
+        only `text` is analysed, and values seen in earlier turns keep their placeholders.
+        """
+        key, cached = self._cached(text)
+        if cached is not None: return self._from_cache(text, cached, vault)
+        # Raises Busy when every analysis slot is taken and the wait queue is full or too slow.
+        with self.admission.cpu_slot():
+            results, report = self.analyze(text)
+            return self._anonymize(text, results, vault, key, report) + (report,)
+
+    def mask_pii_batch(self, texts):
+        """mask_pii() for many texts: the NLP stage runs batched, then each text is anonymized and audited on its own."""
+        texts = list(texts)
+        lookups = [self._cached(text) for text in texts]
+        # Cached texts skip analysis, documents that need chunking are analysed on their own; the rest share the batched pass.
+        short = [i for i, text in enumerate(texts) if lookups[i][1] is None and not self.needs_chunking(text)]
+        batch = [texts[i] for i in short]
+        # The whole batch holds one analysis slot.
+        misses = any(cached is None for _, cached in lookups)
+        with self.admission.cpu_slot() if misses else contextlib.nullcontext():
+            if self.detector is not None: analyzed = self.detector.analyze_batch(batch, TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD, batch_size=NLP_BATCH_SIZE)
+            else: analyzed = [(results, None) for results in analyze_batch(self.analyzer, batch, TARGET_ENTITIES, score_threshold=SCORE_THRESHOLD, batch_size=NLP_BATCH_SIZE)]
+            analyzed_by_index = dict(zip(short, analyzed))
+            masked = []
+            for i, text in enumerate(texts):
+                key, cached = lookups[i]
+                if cached is not None: masked.append(self._from_cache(text, cached))
+                else:
+                    results, report = analyzed_by_index[i] if i in analyzed_by_index else self.analyze(text)
+                    masked.append(self._anonymize(text, results, key=key, report=report) + (report,))
+        return masked
+
+    def _cached(self, text):
+        """(cache key, cached (spans, report) or None); the key is None when caching is off."""
+        if self.mask_cache is None: return None, None
+        key = cache_key(text, TARGET_ENTITIES, SCORE_THRESHOLD, jargon_fingerprint(self.analyzer), self._cache_config)
+        return key, self.mask_cache.get(key)
+
+    def _from_cache(self, text, cached, vault=None):
+        spans, report = cached
+        return self._mask(text, spans, vault) + (dict(report, cached=True) if report else report,)
+
+    def _anonymize(self, text, results, vault=None, key=None, report=None):
+        # "keep" lets the anonymizer resolve overlapping results without rewriting the text,
+        # so its items are in original coordinates and the vault can number them.
+        anonymized_result = self.anonymizer.anonymize(text=text, analyzer_results=results, operators={"DEFAULT": OperatorConfig("keep")})
+        spans = [Span(item.entity_type, item.start, item.end) for item in anonymized_result.items]
+        if key: self.mask_cache.put(key, spans, report)
+        return self._mask(text, spans, vault)
+
+    def _mask(self, text, spans, vault=None):
+        if vault is None: vault = PlaceholderVault()
+        safe_text = vault.mask(text, spans)
+        self.log_audit_event(len(text), spans)
+        return safe_text, vault
+
+    def log_audit_event(self, original_len, secret_map):
+        if self.audit_sink is not None: self.audit_sink.submit(audit_entry(original_len, secret_map))
+
+    def close(self):
+        if self._chunked is not None: self._chunked.close()
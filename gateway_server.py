@@ -0,0 +1,187 @@
+import json
+import asyncio
+import argparse
+from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
+
+from vault import PlaceholderVault
+from gateway_core import GatewayPipeline, build_audit_store, build_audit_sink, validate_input, unmask_pii, acomplete, get_llm_client, get_response_cache, single_flight_stats
+from llm_resilience import LLMError, LLMTimeout, CircuitOpen
+from admission import Busy
+
+# HTTP SERVICE
+# A small HTTP/1.1 JSON server on asyncio streams (keep-alive, Content-Length
+# bodies only). Presidio work runs on a dedicated thread pool; LLM calls are
+# awaited on the shared async client, so neither blocks the event loop.
+MAX_BODY_BYTES = 4 * 1024 * 1024
+MAX_HEADERS = 100
+IDLE_TIMEOUT = 30.0
+
+class HttpError(Exception):
+    def __init__(self, status, message, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+def _busy(e):
+    return HttpError(HTTPStatus.SERVICE_UNAVAILABLE, f"Gateway busy: {e}", retry_after=e.retry_after)
+
+def _vault_from_payload(payload):
+    if not isinstance(payload, dict) or not all(isinstance(v, str) for v in payload.values()):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "placeholders must map placeholder strings to values")
+    try: return PlaceholderVault.from_values(payload)
+    except ValueError as e: raise HttpError(HTTPStatus.BAD_REQUEST, str(e))
+
+def _field(body, name):
+    value = body.get(name)
+    if not isinstance(value, str): raise HttpError(HTTPStatus.BAD_REQUEST, f"'{name}' must be a string")
+    return value
+
+class GatewayServer:
+    """Serves POST /mask, /unmask and /chat (JSON in, JSON out) plus GET /health."""
+
+    def __init__(self, pipeline, mask_workers=None):
+        self.pipeline = pipeline
+        # Enough threads for every admitted and queued request, so requests wait in the
+        # admission gate (bounded, with a deadline) rather than unseen in the pool's queue.
+        gate = pipeline.admission.cpu
+        mask_workers = mask_workers or gate.limit + gate.max_queue
+        self._mask_pool = ThreadPoolExecutor(max_workers=mask_workers, thread_name_prefix="mask")
+        self._in_flight = 0
+        self._routes = {("POST", "/mask"): self.mask, ("POST", "/unmask"): self.unmask,
+                        ("POST", "/chat"): self.chat, ("GET", "/health"): self.health}
+
+    # Endpoints
+    async def mask(self, body):
+        text, error = validate_input(_field(body, "text"))
+        if error: raise HttpError(HTTPStatus.UNPROCESSABLE_ENTITY, error)
+        safe_text, vault, report = await self._mask(text)
+        return {"masked": safe_text, "placeholders": vault.values, "vault_id": self.pipeline.vaults.put(vault), "report": report}
+
+    async def unmask(self, body):
+        if "vault_id" in body:
+            vault = self.pipeline.vaults.get(_field(body, "vault_id"))
+            if vault is None: raise HttpError(HTTPStatus.NOT_FOUND, "Unknown or expired vault_id")
+        else: vault = _vault_from_payload(body.get("placeholders") or {})
+        return {"text": unmask_pii(_field(body, "text"), vault)}
+
+    async def chat(self, body):
+        text, error = validate_input(_field(body, "text"))
+        if error: raise HttpError(HTTPStatus.UNPROCESSABLE_ENTITY, error)
+        safe_text, vault, _ = await self._mask(text)
+        try: ai_answer = await acomplete(safe_text)
+        except Busy as e: raise _busy(e)
+        except LLMTimeout as e: raise HttpError(HTTPStatus.GATEWAY_TIMEOUT, str(e))
+        except CircuitOpen as e: raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+        except LLMError as e: raise HttpError(HTTPStatus.BAD_GATEWAY, str(e))
+        return {"response": unmask_pii(ai_answer, vault), "masked": safe_text}
+
+    async def health(self, body):
+        sink, mask_cache, response_cache = self.pipeline.audit_sink, self.pipeline.mask_cache, get_response_cache()
+        return {"status": "ok", "in_flight": self._in_flight, "audit": sink.stats() if sink is not None else None,
+                "llm": dict(get_llm_client().metrics.stats(), **get_llm_client().stats()), "single_flight": single_flight_stats(), "vaults": self.pipeline.vaults.stats(),
+                "admission": self.pipeline.admission.stats(),
+                "mask_cache": mask_cache.stats() if mask_cache is not None else None,
+                "llm_cache": response_cache.stats() if response_cache is not None else None}
+
+    async def _mask(self, text):
+        try: return await self._run(self._mask_pool, self.pipeline.mask_pii, text)
+        except Busy as e: raise _busy(e)
+
+    async def _run(self, pool, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+    # Protocol
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try: request = await asyncio.wait_for(self._read_request(reader), IDLE_TIMEOUT)
+                except HttpError as e:
+                    await self._respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None: break
+                method, path, body, keep_alive = request
+                status, payload, headers = await self._dispatch(method, path, body)
+                await self._respond(writer, status, payload, keep_alive, headers)
+                if not keep_alive: break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError): pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        line = await reader.readline()
+        if not line: return None
+        try: method, target, version = line.decode("latin-1").split()
+        except ValueError: raise HttpError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b"\r\n", b"\n", b""): break
+            if len(headers) >= MAX_HEADERS: raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+            name, _, value = header.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "transfer-encoding" in headers: raise HttpError(HTTPStatus.LENGTH_REQUIRED, "Chunked bodies are not supported")
+        try: length = int(headers.get("content-length", "0"))
+        except ValueError: raise HttpError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES: raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method.upper(), target.split("?", 1)[0], body, keep_alive
+
+    async def _dispatch(self, method, path, raw_body):
+        handler = self._routes.get((method, path))
+        if handler is None:
+            allowed = any(route_path == path for _, route_path in self._routes)
+            return (HTTPStatus.METHOD_NOT_ALLOWED if allowed else HTTPStatus.NOT_FOUND), {"error": f"{method} {path} not supported"}, {}
+        self._in_flight += 1
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+            if not isinstance(body, dict): raise HttpError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object")
+            return HTTPStatus.OK, await handler(body), {}
+        except json.JSONDecodeError as e: return HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {e}"}, {}
+        except HttpError as e:
+            headers = {"Retry-After": str(max(1, round(e.retry_after)))} if e.retry_after is not None else {}
+            return e.status, {"error": str(e)}, headers
+        except Exception as e: return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}, {}
+        finally: self._in_flight -= 1
+
+    async def _respond(self, writer, status, payload, keep_alive, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        status = HTTPStatus(status)
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                + "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items()) + "\r\n")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    def close(self):
+        self._mask_pool.shutdown()
+
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle_connection, host, port)
+    print(f"Gateway API listening on http://{host}:{port}")
+    try:
+        async with listener: await listener.serve_forever()
+    finally: await get_llm_client().aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the privacy gateway pipeline over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--mask-workers", type=int, default=None, help="Threads running Presidio analysis (default: admission limit + queue)")
+    parser.add_argument("--jargon", default="", help="Comma-separated protected terms")
+    args = parser.parse_args()
+
+    audit_sink = build_audit_sink(build_audit_store())
+    pipeline = GatewayPipeline(audit_sink=audit_sink)
+    pipeline.set_jargon([word.strip() for word in args.jargon.split(",") if word.strip()])
+    server = GatewayServer(pipeline, mask_workers=args.mask_workers)
+    try: asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt: pass
+    finally:
+        server.close()
+        pipeline.close()
+        audit_sink.close()
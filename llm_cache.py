@@ -0,0 +1,89 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+# LLM RESPONSE CACHE
+# Completions keyed by everything that was sent upstream. Prompts reach the
+# LLM already masked, so the key and the stored completion contain
+# placeholders only; re-identification still happens per caller.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_responses (
+    key TEXT PRIMARY KEY,
+    completion TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_responses_used ON llm_responses(used);
+"""
+TRIM_EVERY = 100
+
+def response_key(base_url, model, temperature, messages):
+    payload = json.dumps({"url": base_url, "model": model, "temperature": temperature, "messages": messages},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """SQLite cache of masked completions with a TTL and a row cap (least recently used rows go first)."""
+
+    def __init__(self, path, ttl=86400.0, max_entries=10000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "expired": 0, "evicted": 0}
+        with self._connect() as conn: conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """The cached completion for `key`, or None."""
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute("SELECT completion, created FROM llm_responses WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[1] + self.ttl <= now:
+            with conn: conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            self._count("expired")
+            row = None
+        if row is None:
+            self._count("misses")
+            return None
+        with conn: conn.execute("UPDATE llm_responses SET used = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return row[0]
+
+    def put(self, key, completion):
+        now = time.time()
+        with self._lock:
+            self._writes += 1
+            trim = self._writes % TRIM_EVERY == 0
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO llm_responses (key, completion, created, used) VALUES (?, ?, ?, ?)",
+                         (key, completion, now, now))
+            if trim: self._trim(conn, now)
+        self._count("stored")
+
+    def _trim(self, conn, now):
+        expired = conn.execute("DELETE FROM llm_responses WHERE created <= ?", (now - self.ttl,)).rowcount
+        evicted = conn.execute("DELETE FROM llm_responses WHERE key IN (SELECT key FROM llm_responses ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                               (self.max_entries,)).rowcount
+        self._count("expired", expired)
+        self._count("evicted", evicted)
+
+    def stats(self):
+        entries = self._connect().execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        with self._lock: return dict(self._stats, entries=entries, max_entries=self.max_entries)
+
+    def _count(self, key, n=1):
+        with self._lock: self._stats[key] += n
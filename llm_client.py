@@ -0,0 +1,171 @@
+import json
+import time
+import threading
+from collections import deque
+
+import httpx
+
+# LLM CLIENT
+# One pooled, keep-alive HTTP client per process for any OpenAI-compatible chat
+# endpoint (Groq: https://api.groq.com/openai/v1). Each call is traced through
+# httpcore, so the metrics show whether it opened a new connection, and what
+# connection setup (TCP + TLS) it cost, or reused an idle one.
+METRICS_WINDOW = 1000
+
+def _percentile(samples, q):
+    if not samples: return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class CallTrace:
+    """httpcore trace hook for one request: records whether a connection was opened and how long that took."""
+
+    __slots__ = ("new_connection", "setup_ms", "_mark")
+
+    def __init__(self):
+        self.new_connection = False
+        self.setup_ms = 0.0
+        self._mark = None
+
+    def record(self, name):
+        now = time.perf_counter()
+        if name in ("connection.connect_tcp.started", "connection.start_tls.started"):
+            self.new_connection = True
+            self._mark = now
+        elif name in ("connection.connect_tcp.complete", "connection.start_tls.complete") and self._mark is not None:
+            self.setup_ms += (now - self._mark) * 1000
+            self._mark = None
+
+    def __call__(self, name, info):
+        self.record(name)
+
+class AsyncCallTrace(CallTrace):
+    __slots__ = ()
+
+    # The async connection pool requires an awaitable trace hook.
+    async def __call__(self, name, info):
+        self.record(name)
+
+class LLMMetrics:
+    """Per-call latency split by new vs reused connection, and the setup time reuse saved."""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.new_connections = 0
+        self._latency = {"new": deque(maxlen=window), "reused": deque(maxlen=window)}
+        self._setup = deque(maxlen=window)
+        self._first_token = deque(maxlen=window)
+
+    def record(self, trace, latency_ms, ok=True):
+        with self._lock:
+            self.calls += 1
+            if not ok: self.errors += 1
+            if trace.new_connection:
+                self.new_connections += 1
+                self._setup.append(trace.setup_ms)
+            self._latency["new" if trace.new_connection else "reused"].append(latency_ms)
+
+    def record_first_token(self, latency_ms):
+        with self._lock: self._first_token.append(latency_ms)
+
+    def stats(self):
+        with self._lock:
+            reused = self.calls - self.new_connections
+            setup = sum(self._setup) / len(self._setup) if self._setup else None
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "p50_ms_new": _percentile(self._latency["new"], 0.5),
+                "p50_ms_reused": _percentile(self._latency["reused"], 0.5),
+                "p50_ms_first_token": _percentile(self._first_token, 0.5),
+                "avg_setup_ms": setup,
+                "saved_ms": reused * setup if setup is not None else None,
+            }
+
+def _stream_delta(line):
+    # "data: {...}" -> the chunk's content; None for "data: [DONE]" and anything without content.
+    if not line.startswith("data:"): return None
+    data = line[5:].strip()
+    if data == "[DONE]": return None
+    choices = json.loads(data).get("choices") or [{}]
+    return choices[0].get("delta", {}).get("content") or None
+
+class LLMClient:
+    """Long-lived chat-completions client shared by every session and thread (sync) or event loop task (async)."""
+
+    def __init__(self, api_key, base_url, model, max_connections=20, max_keepalive=10, keepalive_expiry=30.0,
+                 connect_timeout=5.0, read_timeout=60.0, metrics=None):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.metrics = metrics or LLMMetrics()
+        self._options = {
+            "base_url": self.base_url,
+            "headers": {"Authorization": f"Bearer {api_key}"},
+            "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive, keepalive_expiry=keepalive_expiry),
+            "timeout": httpx.Timeout(read_timeout, connect=connect_timeout),
+        }
+        self._client = httpx.Client(**self._options)
+        self._async_client = None
+
+    def _payload(self, messages, temperature, **options):
+        return dict(options, model=self.model, messages=messages, temperature=temperature)
+
+    @staticmethod
+    def _content(response):
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+
+    @staticmethod
+    def _timeout(timeout):
+        # A per-call budget (seconds) overrides the client's timeouts for every phase of that call.
+        return httpx.USE_CLIENT_DEFAULT if timeout is None else httpx.Timeout(max(timeout, 0.001))
+
+    def chat(self, messages, temperature=0.7, timeout=None, **options):
+        trace, began, ok = CallTrace(), time.perf_counter(), False
+        try:
+            response = self._client.post("/chat/completions", json=self._payload(messages, temperature, **options),
+                                         timeout=self._timeout(timeout), extensions={"trace": trace})
+            content = self._content(response)
+            ok = True
+            return content
+        finally: self.metrics.record(trace, (time.perf_counter() - began) * 1000, ok)
+
+    async def achat(self, messages, temperature=0.7, timeout=None, **options):
+        # Created on first use so it binds to the event loop that uses it.
+        if self._async_client is None: self._async_client = httpx.AsyncClient(**self._options)
+        trace, began, ok = AsyncCallTrace(), time.perf_counter(), False
+        try:
+            response = await self._async_client.post("/chat/completions", json=self._payload(messages, temperature, **options),
+                                                     timeout=self._timeout(timeout), extensions={"trace": trace})
+            content = self._content(response)
+            ok = True
+            return content
+        finally: self.metrics.record(trace, (time.perf_counter() - began) * 1000, ok)
+
+    def stream_chat(self, messages, temperature=0.7, timeout=None, **options):
+        """Yield the completion's content as it arrives (server-sent events with "stream": true)."""
+        trace, began, ok, first = CallTrace(), time.perf_counter(), False, True
+        try:
+            payload = self._payload(messages, temperature, stream=True, **options)
+            with self._client.stream("POST", "/chat/completions", json=payload, timeout=self._timeout(timeout), extensions={"trace": trace}) as response:
+                response.raise_for_status()
+                # Read to the end of the body even after [DONE] so the connection can go back to the pool.
+                for line in response.iter_lines():
+                    content = _stream_delta(line)
+                    if content is None: continue
+                    if first:
+                        self.metrics.record_first_token((time.perf_counter() - began) * 1000)
+                        first = False
+                    yield content
+            ok = True
+        finally: self.metrics.record(trace, (time.perf_counter() - began) * 1000, ok)
+
+    def close(self):
+        self._client.close()
+
+    async def aclose(self):
+        if self._async_client is not None: await self._async_client.aclose()
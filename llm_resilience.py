@@ -0,0 +1,277 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import httpx
+
+from llm_client import _percentile, METRICS_WINDOW
+
+# LLM RESILIENCE
+# Deadlines, jittered retries, optional hedging and a circuit breaker around
+# LLMClient. Failures surface as typed LLMError subclasses instead of bare
+# httpx exceptions, so callers can tell "slow" from "down" from "rejected".
+class LLMError(Exception):
+    retryable = False
+
+class LLMTimeout(LLMError):
+    retryable = True
+
+class LLMUnavailable(LLMError):
+    """Connection failures, 429 and 5xx responses."""
+    retryable = True
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class LLMRejected(LLMError):
+    """Any other 4xx: retrying the same request will not help."""
+
+class CircuitOpen(LLMError):
+    def __init__(self, retry_in):
+        super().__init__(f"LLM provider marked unhealthy; retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+def _retry_after(response):
+    try: return float(response.headers.get("retry-after", ""))
+    except ValueError: return None
+
+def classify(exc):
+    """The LLMError for an exception raised by an LLMClient call."""
+    if isinstance(exc, LLMError): return exc
+    if isinstance(exc, httpx.TimeoutException): return LLMTimeout(f"LLM request timed out ({type(exc).__name__})")
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        if status == 429 or status >= 500: return LLMUnavailable(f"LLM provider returned {status}", _retry_after(exc.response))
+        return LLMRejected(f"LLM provider rejected the request ({status})")
+    if isinstance(exc, httpx.TransportError): return LLMUnavailable(f"LLM connection failed ({type(exc).__name__})")
+    return LLMError(f"{type(exc).__name__}: {exc}")
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive upstream failures; after `reset_timeout` one trial call is let through."""
+
+    def __init__(self, failures=5, reset_timeout=30.0):
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+        self.trips = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None: return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.reset_timeout else "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None: return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_timeout or self._trial: raise CircuitOpen(max(0.0, self.reset_timeout - waited))
+            self._trial = True
+
+    def record(self, ok):
+        with self._lock:
+            self._trial = False
+            if ok:
+                self._consecutive, self._opened_at = 0, None
+                return
+            self._consecutive += 1
+            if self._opened_at is not None or self._consecutive >= self.failures:
+                if self._opened_at is None: self.trips += 1
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that says nothing about upstream health (rejected, cancelled) without a verdict."""
+        with self._lock: self._trial = False
+
+class ResilientLLM:
+    """Wraps an LLMClient: each call gets a deadline, retryable failures are retried with
+    full-jitter backoff, and (if `hedge` is set) a second request is raced against one that
+    has run longer than the `hedge_quantile` of recent latencies."""
+
+    def __init__(self, client, deadline=30.0, retries=2, backoff=0.25, max_backoff=4.0,
+                 hedge=False, hedge_quantile=0.95, hedge_min_samples=20, breaker=None):
+        self.client = client
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self._latency = deque(maxlen=METRICS_WINDOW)
+        self._lock = threading.Lock()
+        self._stats = {"retries": 0, "hedged": 0, "hedge_wins": 0, "timeouts": 0, "rejected_fast": 0}
+        self._hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge") if hedge else None
+
+    @property
+    def metrics(self):
+        return self.client.metrics
+
+    # Policy
+    def _count(self, key):
+        with self._lock: self._stats[key] += 1
+
+    def _hedge_delay(self):
+        with self._lock:
+            if not self.hedge or len(self._latency) < self.hedge_min_samples: return None
+            return _percentile(self._latency, self.hedge_quantile)
+
+    def _backoff(self, attempt, error, remaining):
+        """Seconds to sleep before retry `attempt`, or None when the error or the deadline rules it out."""
+        if not error.retryable or attempt > self.retries: return None
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+        if getattr(error, "retry_after", None): delay = max(delay, min(error.retry_after, self.max_backoff))
+        return delay if delay < remaining else None
+
+    def _begin(self):
+        try: self.breaker.before_call()
+        except CircuitOpen:
+            self._count("rejected_fast")
+            raise
+
+    def _settle(self, error=None, elapsed=None):
+        # 4xx responses say nothing about the provider's health, but a half-open trial must still end.
+        if error is None or error.retryable: self.breaker.record(error is None)
+        else: self.breaker.release()
+        if error is None and elapsed is not None:
+            with self._lock: self._latency.append(elapsed)
+        if isinstance(error, LLMTimeout): self._count("timeouts")
+
+    # Calls
+    def chat(self, messages, temperature=0.7, **options):
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            self._begin()
+            began = time.monotonic()
+            try: content = self._attempt(messages, temperature, deadline, options)
+            except Exception as e:
+                error = classify(e)
+                self._settle(error)
+                delay = self._backoff(attempt, error, deadline - time.monotonic())
+                if delay is None: raise error from e
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self._settle(elapsed=time.monotonic() - began)
+            return content
+
+    def _attempt(self, messages, temperature, deadline, options):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0: raise LLMTimeout(f"LLM deadline of {self.deadline:.0f}s exceeded")
+        call = lambda: self.client.chat(messages, temperature, timeout=deadline - time.monotonic(), **options)
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None or hedge_delay >= remaining: return call()
+        first = self._hedge_pool.submit(call)
+        done, _ = wait([first], timeout=hedge_delay)
+        if done: return first.result()
+        self._count("hedged")
+        second = self._hedge_pool.submit(call)
+        pending = {first, second}
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done: raise LLMTimeout(f"LLM deadline of {self.deadline:.0f}s exceeded")
+            for future in done:
+                if future.exception() is None:
+                    if future is second: self._count("hedge_wins")
+                    # The slower request cannot be cancelled mid-flight; it finishes in the background.
+                    return future.result()
+        return first.result()  # both failed: report the original request's error
+
+    async def achat(self, messages, temperature=0.7, **options):
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            self._begin()
+            began = time.monotonic()
+            try: content = await self._aattempt(messages, temperature, deadline, options)
+            except Exception as e:
+                error = classify(e)
+                self._settle(error)
+                delay = self._backoff(attempt, error, deadline - time.monotonic())
+                if delay is None: raise error from e
+                self._count("retries")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:  # cancelled
+                self.breaker.release()
+                raise
+            self._settle(elapsed=time.monotonic() - began)
+            return content
+
+    async def _aattempt(self, messages, temperature, deadline, options):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0: raise LLMTimeout(f"LLM deadline of {self.deadline:.0f}s exceeded")
+        call = lambda: asyncio.ensure_future(self.client.achat(messages, temperature, timeout=deadline - time.monotonic(), **options))
+        hedge_delay = self._hedge_delay()
+        tasks = [call()]
+        try:
+            if hedge_delay is not None and hedge_delay < remaining:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    self._count("hedged")
+                    tasks.append(call())
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED)
+                if not done: raise LLMTimeout(f"LLM deadline of {self.deadline:.0f}s exceeded")
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]: self._count("hedge_wins")
+                        return task.result()
+            return tasks[0].result()
+        finally:
+            for task in tasks: task.cancel()
+
+    def stream_chat(self, messages, temperature=0.7, **options):
+        """Streams are not hedged, and only retried until their first chunk has been yielded."""
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            self._begin()
+            began, started = time.monotonic(), False
+            try:
+                for chunk in self.client.stream_chat(messages, temperature, timeout=deadline - time.monotonic(), **options):
+                    if time.monotonic() > deadline: raise LLMTimeout(f"LLM deadline of {self.deadline:.0f}s exceeded")
+                    started = True
+                    yield chunk
+            except GeneratorExit:
+                # The reader stopped early; the provider was answering, and a half-open breaker must not stay in its trial.
+                self._settle()
+                raise
+            except Exception as e:
+                error = classify(e)
+                self._settle(error)
+                delay = None if started else self._backoff(attempt, error, deadline - time.monotonic())
+                if delay is None: raise error from e
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            self._settle(elapsed=time.monotonic() - began)
+            return
+
+    def stats(self):
+        with self._lock: snapshot = dict(self._stats)
+        snapshot.update(breaker=self.breaker.state, breaker_trips=self.breaker.trips)
+        return snapshot
+
+    def close(self):
+        if self._hedge_pool is not None: self._hedge_pool.shutdown(wait=False)
+        self.client.close()
+
+    async def aclose(self):
+        await self.client.aclose()
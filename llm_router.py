@@ -0,0 +1,165 @@
+import time
+import random
+import threading
+
+from llm_resilience import LLMError, LLMRejected, CircuitOpen
+
+# LLM ROUTING
+# Several OpenAI-compatible backends (Groq models, other providers, a local
+# server) behind one client. Each request goes to the backend with the best
+# EWMA latency, weighted by its EWMA error rate; if it fails, the next best
+# one is tried. Completions are ranked by full-response latency and streams
+# by time to first token, each with its own EWMA.
+class Backend:
+    """One routable endpoint: a ResilientLLM plus the health estimates the router ranks it by."""
+
+    def __init__(self, name, llm, alpha=0.2):
+        self.name = name
+        self.llm = llm
+        self.alpha = alpha
+        self.latency_ms = None      # EWMA over successful completions
+        self.first_token_ms = None  # EWMA over successful streams, to their first chunk
+        self.error_rate = 0.0   # EWMA over all calls (1 = failed)
+        self.calls = 0
+        self.failures = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self.llm.client.model
+
+    def score(self, error_penalty, stream=False):
+        """Expected cost of sending a request here (lower is better); untried backends go first, ones that never succeeded last."""
+        with self._lock:
+            estimate = self.first_token_ms if stream else self.latency_ms
+            if estimate is None:
+                never_succeeded = self.calls > 0 and self.latency_ms is None and self.first_token_ms is None
+                return float("inf") if never_succeeded else 0.0
+            return estimate * (1 + self.in_flight) * (1 + error_penalty * self.error_rate)
+
+    def available(self):
+        return self.llm.breaker.state != "open"
+
+    def start(self):
+        with self._lock: self.in_flight += 1
+
+    def finish(self, latency_ms=None, ok=True, stream=False):
+        """Record a finished call; `latency_ms` is the full response time, or the time to first token when `stream` is set."""
+        with self._lock:
+            self.in_flight -= 1
+            self.calls += 1
+            if not ok: self.failures += 1
+            self.error_rate += self.alpha * ((0.0 if ok else 1.0) - self.error_rate)
+            if ok and latency_ms is not None:
+                if stream: self.first_token_ms = self._ewma(self.first_token_ms, latency_ms)
+                else: self.latency_ms = self._ewma(self.latency_ms, latency_ms)
+
+    def _ewma(self, current, sample):
+        return sample if current is None else current + self.alpha * (sample - current)
+
+    def stats(self):
+        with self._lock:
+            snapshot = {"model": self.model, "calls": self.calls, "failures": self.failures, "in_flight": self.in_flight,
+                        "ewma_ms": self.latency_ms, "ewma_first_token_ms": self.first_token_ms, "error_rate": self.error_rate}
+        snapshot.update(self.llm.stats())
+        return snapshot
+
+class LLMRouter:
+    """Routes each call to the healthiest, fastest backend and fails over to the others.
+
+    A small share of requests (`explore`) goes to a random backend with a closed
+    breaker so that the estimates of backends that are not currently preferred
+    stay fresh. Backends whose breaker is open or half-open are never explored:
+    they only get traffic once the better-ranked ones have failed.
+    """
+
+    def __init__(self, backends, error_penalty=10.0, explore=0.05, metrics=None):
+        if not backends: raise ValueError("LLMRouter needs at least one backend")
+        self.backends = list(backends)
+        self.error_penalty = error_penalty
+        self.explore = explore
+        self.metrics = metrics or self.backends[0].llm.metrics
+        self._lock = threading.Lock()
+        self.failovers = 0
+
+    def ranked(self, stream=False):
+        """Backends in the order they should be tried: available ones by score, then those with an open breaker."""
+        available = sorted((b for b in self.backends if b.available()), key=lambda b: b.score(self.error_penalty, stream))
+        if len(available) > 1 and random.random() < self.explore:
+            explorable = [b for b in available[1:] if b.llm.breaker.state == "closed"]
+            if explorable:
+                choice = random.choice(explorable)
+                available.remove(choice)
+                available.insert(0, choice)
+        return available + [b for b in self.backends if b not in available]
+
+    def _failed_over(self):
+        with self._lock: self.failovers += 1
+
+    def _should_fail_over(self, error, backend, ranked):
+        # A rejected request would be rejected everywhere; anything else is worth another backend.
+        return not isinstance(error, LLMRejected) and backend is not ranked[-1]
+
+    def chat(self, messages, temperature=0.7, **options):
+        ranked = self.ranked()
+        for backend in ranked:
+            backend.start()
+            began = time.perf_counter()
+            try: content = backend.llm.chat(messages, temperature, **options)
+            except LLMError as e:
+                backend.finish(ok=isinstance(e, (LLMRejected, CircuitOpen)))
+                if not self._should_fail_over(e, backend, ranked): raise
+                self._failed_over()
+                continue
+            backend.finish((time.perf_counter() - began) * 1000)
+            return content
+
+    async def achat(self, messages, temperature=0.7, **options):
+        ranked = self.ranked()
+        for backend in ranked:
+            backend.start()
+            began = time.perf_counter()
+            try: content = await backend.llm.achat(messages, temperature, **options)
+            except LLMError as e:
+                backend.finish(ok=isinstance(e, (LLMRejected, CircuitOpen)))
+                if not self._should_fail_over(e, backend, ranked): raise
+                self._failed_over()
+                continue
+            backend.finish((time.perf_counter() - began) * 1000)
+            return content
+
+    def stream_chat(self, messages, temperature=0.7, **options):
+        """Fails over only until the first chunk has been yielded; ranked and recorded by time to first token."""
+        ranked = self.ranked(stream=True)
+        for backend in ranked:
+            backend.start()
+            began, first_token_ms, finished = time.perf_counter(), None, False
+            try:
+                for chunk in backend.llm.stream_chat(messages, temperature, **options):
+                    if first_token_ms is None: first_token_ms = (time.perf_counter() - began) * 1000
+                    yield chunk
+            except LLMError as e:
+                backend.finish(ok=isinstance(e, (LLMRejected, CircuitOpen)))
+                finished = True
+                if first_token_ms is not None or not self._should_fail_over(e, backend, ranked): raise
+                self._failed_over()
+                continue
+            finally:
+                if not finished: backend.finish(first_token_ms, stream=True)
+            return
+
+    def stats(self):
+        """Totals of the per-backend resilience counters, plus each backend's own stats."""
+        backends = {b.name: b.stats() for b in self.backends}
+        totals = {key: sum(s[key] for s in backends.values()) for key in ("retries", "hedged", "hedge_wins", "timeouts", "rejected_fast", "breaker_trips")}
+        states = {s["breaker"] for s in backends.values()}
+        totals["breaker"] = states.pop() if len(states) == 1 else "mixed"
+        with self._lock: totals["failovers"] = self.failovers
+        return dict(totals, backends=backends)
+
+    def close(self):
+        for backend in self.backends: backend.llm.close()
+
+    async def aclose(self):
+        for backend in self.backends: await backend.llm.aclose()
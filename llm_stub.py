@@ -0,0 +1,111 @@
+import sys
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# LOCAL LLM STUB
+# An OpenAI-compatible /chat/completions endpoint that echoes the last user
+# message back, for exercising the gateway without a Groq key:
+#
+#   python llm_stub.py --port 8090
+#   LLM_BASE_URL=http://127.0.0.1:8090/v1 GROQ_API_KEY=stub python gateway_cli.py ...
+#
+# --error-rate and --slow-rate inject 503s and slow answers, for exercising
+# retries, hedging and the circuit breaker.
+
+def completion(model, content):
+    return {
+        "id": f"stub-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+    }
+
+def completion_chunk(model, content=None, finish_reason=None):
+    delta = {"content": content} if content is not None else {}
+    return {"object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+def reply_for(messages):
+    user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    return f"Echo: {user}"
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+    disable_nagle_algorithm = True
+    delay = 0.0
+    chunk_size = 4  # small on purpose, so placeholders get split across chunks
+    chunk_delay = 0.0
+    error_rate = 0.0
+    slow_rate = 0.0
+    slow_delay = 0.0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        if not self.path.endswith("/chat/completions"): return self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+        try: request = json.loads(body)
+        except json.JSONDecodeError as e: return self._send(400, {"error": {"message": str(e)}})
+        if random.random() < self.error_rate: return self._send(503, {"error": {"message": "Injected failure"}})
+        delay = self.delay + (self.slow_delay if random.random() < self.slow_rate else 0.0)
+        if delay: time.sleep(delay)
+        model, reply = request.get("model", "stub"), reply_for(request.get("messages", []))
+        if request.get("stream"): return self._stream(model, reply)
+        self._send(200, completion(model, reply))
+
+    def _stream(self, model, reply):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        pieces = [reply[i:i + self.chunk_size] for i in range(0, len(reply), self.chunk_size)]
+        events = [completion_chunk(model, piece) for piece in pieces] + [completion_chunk(model, finish_reason="stop")]
+        for event in events:
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            if self.chunk_delay: time.sleep(self.chunk_delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that hang up mid-answer (timed-out or losing hedged requests) are expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError): super().handle_error(request, client_address)
+
+def make_server(host="127.0.0.1", port=8090, delay=0.0, chunk_delay=0.0, error_rate=0.0, slow_rate=0.0, slow_delay=0.0):
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"delay": delay, "chunk_delay": chunk_delay, "error_rate": error_rate,
+                                                             "slow_rate": slow_rate, "slow_delay": slow_delay})
+    return StubServer((host, port), handler)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible LLM stub that echoes the prompt.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds to wait before answering")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests delayed by --slow-delay")
+    parser.add_argument("--slow-delay", type=float, default=1.0, help="Extra seconds for slow requests")
+    args = parser.parse_args()
+    server = make_server(args.host, args.port, args.delay, args.chunk_delay, args.error_rate, args.slow_rate, args.slow_delay)
+    print(f"LLM stub listening on http://{args.host}:{args.port}/v1")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
@@ -0,0 +1,118 @@
+import json
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from vault import Span
+
+# MASK CACHE
+# Detection results keyed by a hash of the text and everything that affects
+# detection. Only entity types and offsets are stored, never the text or the
+# values they cover, so the optional on-disk copy holds no PII.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mask_cache (
+    key TEXT PRIMARY KEY,
+    spans TEXT NOT NULL,
+    report TEXT,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_mask_cache_used ON mask_cache(used);
+"""
+DISK_TRIM_EVERY = 100
+
+def cache_key(text, entities, score_threshold, jargon_fingerprint, config=""):
+    digest = hashlib.sha256()
+    for part in (",".join(entities), repr(score_threshold), jargon_fingerprint, config):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(text.encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+class MaskCache:
+    """LRU cache of (spans, report) with an optional write-through SQLite copy.
+
+    Memory holds at most `max_entries`; the disk copy is trimmed to
+    `max_disk_entries` (least recently used first) every few writes.
+    """
+
+    def __init__(self, max_entries=1024, path=None, max_disk_entries=100_000):
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._clock = 0
+        self._writes = 0
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evicted": 0}
+        if path:
+            with self._connect() as conn: conn.executescript(_SCHEMA)
+            self._clock = self._connect().execute("SELECT COALESCE(MAX(used), 0) FROM mask_cache").fetchone()[0]
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """(spans, report) for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry
+        entry = self._load(key) if self.path else None
+        with self._lock:
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, spans, report):
+        entry = ([Span(*span) for span in spans], report)
+        with self._lock: self._remember(key, entry)
+        if self.path: self._store(key, entry)
+        return entry
+
+    def stats(self):
+        with self._lock: return dict(self._stats, entries=len(self._entries), max_entries=self.max_entries)
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evicted"] += 1
+
+    def _tick(self):
+        with self._lock:
+            self._clock += 1
+            self._writes += 1
+            return self._clock, self._writes % DISK_TRIM_EVERY == 0
+
+    def _load(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT spans, report FROM mask_cache WHERE key = ?", (key,)).fetchone()
+        if row is None: return None
+        used, _ = self._tick()
+        with conn: conn.execute("UPDATE mask_cache SET used = ? WHERE key = ?", (used, key))
+        return [Span(*span) for span in json.loads(row[0])], json.loads(row[1]) if row[1] else None
+
+    def _store(self, key, entry):
+        spans, report = entry
+        used, trim = self._tick()
+        conn = self._connect()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO mask_cache (key, spans, report, used) VALUES (?, ?, ?, ?)",
+                         (key, json.dumps([list(span) for span in spans]), json.dumps(report) if report else None, used))
+            if trim:
+                conn.execute("DELETE FROM mask_cache WHERE used <= (SELECT used FROM mask_cache ORDER BY used DESC LIMIT 1 OFFSET ?)",
+                             (self.max_disk_entries,))
@@ -0,0 +1,187 @@
+import re
+import hashlib
+import threading
+from collections import OrderedDict, deque
+
+# MULTI-TERM MATCHING
+def normalize_terms(terms):
+    return sorted({term.strip().lower() for term in terms if term and term.strip()})
+
+def terms_fingerprint(terms):
+    return hashlib.sha256("\n".join(normalize_terms(terms)).encode("utf-8")).hexdigest()
+
+def _fold(text):
+    # Lower-case without changing length, so match offsets still index the original text.
+    folded = text.lower()
+    if len(folded) == len(text): return folded
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+def _is_word(ch):
+    return ch.isalnum() or ch == "_"
+
+class AhoCorasick:
+    """Case-insensitive whole-word matcher for a fixed term list; scan time is linear in the text."""
+
+    def __init__(self, terms):
+        self.terms = normalize_terms(terms)
+        self.fingerprint = terms_fingerprint(self.terms)
+        # Node i: goto[i] maps char -> node, fail[i] is the failure link and
+        # out[i] holds the lengths of the terms ending at i (own and via dictionary suffixes).
+        self._goto, self._fail, self._out = [{}], [0], [()]
+        for term in self.terms: self._insert(term)
+        self._link()
+
+    def _insert(self, term):
+        node = 0
+        for ch in term:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[node][ch] = nxt
+            node = nxt
+        self._out[node] = (len(term),)
+
+    def _link(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]: fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def finditer(self, text):
+        """Yield non-overlapping (start, end) spans, leftmost-longest first."""
+        folded = _fold(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        n, node, candidates = len(text), 0, []
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]: node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length in out[node]:
+                start, end = i + 1 - length, i + 1
+                if (start == 0 or not _is_word(text[start - 1])) and (end == n or not _is_word(text[end])):
+                    candidates.append((start, end))
+        candidates.sort(key=lambda span: (span[0], -span[1]))
+        last_end = -1
+        for start, end in candidates:
+            if start >= last_end:
+                last_end = end
+                yield start, end
+
+# COMPILED CACHE
+_automata = OrderedDict()
+_automata_lock = threading.Lock()
+MAX_CACHED_AUTOMATA = 8
+
+def compile_terms(terms):
+    """Return the automaton for `terms`, building it only when the term list has changed."""
+    fingerprint = terms_fingerprint(terms)
+    with _automata_lock:
+        automaton = _automata.get(fingerprint)
+        if automaton is not None:
+            _automata.move_to_end(fingerprint)
+            return automaton
+    automaton = AhoCorasick(terms)
+    with _automata_lock:
+        _automata[fingerprint] = automaton
+        while len(_automata) > MAX_CACHED_AUTOMATA: _automata.popitem(last=False)
+    return automaton
+
+# COMBINED REGEX SCANNING
+_UNMERGEABLE = re.compile(r"\\[1-9]|\(\?P[<=]|\(\?[aiLmsux]+\)")
+
+def can_merge(regex, flags=0):
+    """A pattern can join an alternation if it has no backreferences, named groups or global inline flags."""
+    if _UNMERGEABLE.search(regex): return False
+    try: re.compile(f"(?:{regex})|x", flags)
+    except re.error: return False
+    return True
+
+def _has_top_level_alternation(regex):
+    return _top_level_alternation_end(regex) is None
+
+def _top_level_alternation_end(regex):
+    # Index where the depth-0 sequence ends (a closing paren), len(regex), or None on a depth-0 "|".
+    depth, i, in_class = 0, 0, False
+    while i < len(regex):
+        ch = regex[i]
+        if ch == "\\": i += 1
+        elif in_class: in_class = ch != "]"
+        elif ch == "[":
+            in_class = True
+            if regex[i + 1:i + 2] == "^": i += 1
+            if regex[i + 1:i + 2] == "]": i += 1
+        elif ch == "(": depth += 1
+        elif ch == ")":
+            if depth == 0: return i
+            depth -= 1
+        elif ch == "|" and depth == 0: return None
+        i += 1
+    return len(regex)
+
+def _hoist_boundary(regex):
+    """Return an equivalent regex starting with \\b if one exists (e.g. "(\\bx)" -> "\\b(x)"), else None."""
+    if regex.startswith("(\\b"):
+        # Only safe when the leading group has no alternation of its own.
+        if _top_level_alternation_end(regex[1:]) is None: return None
+        regex = "\\b(" + regex[3:]
+    if regex.startswith("\\b") and not _has_top_level_alternation(regex): return regex
+    return None
+
+class CombinedPatternScanner:
+    """Many regexes compiled into one alternation of named groups, scanned in a single pass.
+
+    The scan stops at every position where any pattern matches. The alternation
+    reports the first alternative that matches there; the later alternatives are
+    then tried anchored at that same position only. Per pattern, spans that
+    start inside its previous match are dropped. Each pattern therefore yields
+    exactly what re.finditer would have returned for it alone.
+    """
+
+    def __init__(self, entries):
+        # entries: (regex, flags, payload); patterns with different flags cannot share a regex.
+        self.payloads = {}
+        by_flags = {}
+        for regex, flags, payload in entries:
+            group = f"p{len(self.payloads)}"
+            self.payloads[group] = payload
+            by_flags.setdefault(flags, []).append((group, regex))
+        self._groups = []
+        for flags, members in by_flags.items():
+            # Most detector patterns start with \b. Factoring it out of their
+            # alternatives rejects every position inside a word with one check
+            # instead of one per pattern.
+            anchored = [(g, _hoist_boundary(rx)) for g, rx in members if _hoist_boundary(rx)]
+            others = [(g, rx) for g, rx in members if not _hoist_boundary(rx)]
+            parts = []
+            if anchored: parts.append(r"\b(?:" + "|".join(f"(?P<{g}>{rx[2:]})" for g, rx in anchored) + ")")
+            parts.extend(f"(?P<{g}>{rx})" for g, rx in others)
+            ordered = anchored + others
+            self._groups.append((re.compile("|".join(parts), flags), [(g, re.compile(rx, flags)) for g, rx in ordered]))
+
+    def scan(self, text):
+        """Yield (payload, start, end) for every match."""
+        for combined, members in self._groups:
+            order = {group: i for i, (group, _) in enumerate(members)}
+            last_end, pos, n = {}, 0, len(text)
+            while pos <= n:
+                match = combined.search(text, pos)
+                if match is None: break
+                start = match.start()
+                pos = start + 1
+                # Alternatives before the reported one already failed here; only later ones can also match.
+                spans = [(match.lastgroup, match.end())]
+                for group, pattern in members[order[match.lastgroup] + 1:]:
+                    other = pattern.match(text, start)
+                    if other: spans.append((group, other.end()))
+                for group, end in spans:
+                    if end == start or start < last_end.get(group, 0): continue
+                    last_end[group] = end
+                    yield self.payloads[group], start, end
@@ -0,0 +1,148 @@
+import re
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from presidio_analyzer import AnalyzerEngine, PatternRecognizer, Pattern, RecognizerResult
+from presidio_anonymizer import AnonymizerEngine
+
+from matchers import terms_fingerprint
+from recognizers import JargonRecognizer, install_combined_patterns
+from detection import TieredAnalyzer
+
+# ENGINES
+# Streamlit-free so that worker processes can build their own engines.
+TARGET_ENTITIES = ["PERSON", "EMAIL_ADDRESS", "PHONE_NUMBER", "LOCATION", "CREDIT_CARD", "US_SSN", "US_PASSPORT", "IBAN_CODE", "CUSTOM_JARGON"]
+SCORE_THRESHOLD = 0.4
+
+def build_engines(combined_patterns=True):
+    analyzer = AnalyzerEngine()
+    anonymizer = AnonymizerEngine()
+
+    # Custom Detectors
+    ssn_pattern = Pattern(name="ssn_pattern", regex=r"\b\d{3}-\d{2}-\d{4}\b", score=0.9)
+    ssn_recognizer = PatternRecognizer(supported_entity="US_SSN", name="Force_SSN", patterns=[ssn_pattern])
+    analyzer.registry.add_recognizer(ssn_recognizer)
+
+    cc_pattern = Pattern(name="cc_pattern", regex=r"\b\d{4}-\d{4}-\d{4}-\d{4}\b", score=0.9)
+    cc_recognizer = PatternRecognizer(supported_entity="CREDIT_CARD", name="Force_CC", patterns=[cc_pattern])
+    analyzer.registry.add_recognizer(cc_recognizer)
+
+    if combined_patterns: install_combined_patterns(analyzer)
+
+    return analyzer, anonymizer
+
+def analyze_batch(analyzer, texts, entities, score_threshold=None, batch_size=32, language="en"):
+    """analyzer.analyze() for many texts, with the NLP stage run as one batched spaCy pass."""
+    batch = analyzer.nlp_engine.process_batch(texts, language, batch_size=batch_size)
+    return [analyzer.analyze(text=text, language=language, entities=entities, score_threshold=score_threshold, nlp_artifacts=nlp_artifacts)
+            for text, (_, nlp_artifacts) in zip(texts, batch)]
+
+# JARGON
+def add_jargon_recognizer(analyzer_engine, jargon_list):
+    current = next((r for r in analyzer_engine.registry.recognizers if r.name == "Jargon_List"), None)
+    if current is not None and jargon_list and current.fingerprint == terms_fingerprint(jargon_list): return
+    try: analyzer_engine.registry.remove_recognizer("Jargon_List")
+    except: pass
+    if jargon_list: analyzer_engine.registry.add_recognizer(JargonRecognizer(jargon_list))
+
+def jargon_terms(analyzer_engine):
+    current = next((r for r in analyzer_engine.registry.recognizers if r.name == "Jargon_List"), None)
+    return list(current.matcher.terms) if current is not None else []
+
+def jargon_fingerprint(analyzer_engine):
+    current = next((r for r in analyzer_engine.registry.recognizers if r.name == "Jargon_List"), None)
+    return current.fingerprint if current is not None else terms_fingerprint([])
+
+# CHUNKING
+CHUNK_SIZE = 20000
+CHUNK_OVERLAP = 300
+
+_PARAGRAPH = re.compile(r"\n[ \t]*\n\s*")
+_SENTENCE = re.compile(r"[.!?][\"')\]]*\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+def _boundary(text, low, high):
+    # Last paragraph break in [low, high), else last sentence end, else last whitespace, else a hard cut.
+    for pattern in (_PARAGRAPH, _SENTENCE, _WHITESPACE):
+        last = None
+        for last in pattern.finditer(text, low, high): pass
+        if last is not None: return last.end()
+    return high
+
+def chunk_spans(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Split `text` into (start, end, window_end) triples.
+
+    The [start, end) cores tile the text and end on paragraph or sentence
+    boundaries where possible. Each chunk is analysed up to window_end, `overlap`
+    characters further, so an entity that starts in the core is seen whole
+    even when it crosses `end`.
+    """
+    spans, start, n = [], 0, len(text)
+    while start < n:
+        end = n if n - start <= chunk_size else _boundary(text, start + chunk_size // 2, start + chunk_size)
+        window_end = min(n, end + overlap)
+        gap = _WHITESPACE.search(text, window_end, min(n, window_end + overlap))
+        if window_end < n and gap: window_end = gap.start()
+        spans.append((start, end, window_end))
+        start = end
+    return spans
+
+# CHUNK WORKERS
+_worker = {}
+
+def _init_worker(settings):
+    # Runs once per worker process: the spaCy model and recognizers are loaded here, not per chunk.
+    analyzer, _ = build_engines(combined_patterns=settings.get("combined_patterns", True))
+    _worker["analyzer"] = analyzer
+    _worker["detector"] = TieredAnalyzer(analyzer, policy=settings["ner_policy"]) if settings.get("tiered") else None
+
+def _analyze_chunk(task):
+    text, offset, core_length, entities, score_threshold, terms = task
+    analyzer, detector = _worker["analyzer"], _worker["detector"]
+    add_jargon_recognizer(analyzer, terms)
+    if detector is not None: results, report = detector.analyze(text, entities, score_threshold=score_threshold)
+    else: results, report = analyzer.analyze(text=text, language="en", entities=entities, score_threshold=score_threshold), None
+    # A chunk only reports entities that start in its core; the next chunk owns the rest of the overlap.
+    found = sorted((r.start + offset, r.end + offset, r.entity_type, r.score) for r in results if r.start < core_length)
+    return found, report
+
+def _merge_reports(reports, chunks, elapsed):
+    tiers = {}
+    for report in reports:
+        for tier in report["tiers"]:
+            total = tiers.setdefault(tier["tier"], {"tier": tier["tier"], "ms": 0.0, "results": 0})
+            total["ms"] += tier["ms"]
+            total["results"] += tier["results"]
+    ner_chunks = sum(report["ner"] != "skipped" for report in reports)
+    if not reports: ner = "in full analyzer"
+    else: ner = f"ran on {ner_chunks}/{chunks} chunks" if ner_chunks else "skipped"
+    return {"tiers": list(tiers.values()), "ner": ner, "chunks": chunks, "ms": elapsed}
+
+class ChunkedAnalyzer:
+    """Analyzes large texts as overlapping chunks spread over a pool of worker processes."""
+
+    def __init__(self, workers=None, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, combined_patterns=True, tiered=True, ner_policy="auto"):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        settings = {"combined_patterns": combined_patterns, "tiered": tiered, "ner_policy": ner_policy}
+        # spawn: workers must not inherit the parent's threads (audit writer) or half-initialised models.
+        self._pool = ProcessPoolExecutor(max_workers=workers or None, mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_init_worker, initargs=(settings,))
+
+    def analyze(self, text, entities, score_threshold=None, jargon=()):
+        """Returns (results ordered by position, report); offsets index the full text."""
+        began = time.perf_counter()
+        spans = chunk_spans(text, self.chunk_size, self.overlap)
+        tasks = [(text[start:window_end], start, end - start, list(entities), score_threshold, list(jargon))
+                 for start, end, window_end in spans]
+        results, reports = [], []
+        # map() yields in submission order and every chunk's results are sorted, so the merge stays ordered.
+        for found, report in self._pool.map(_analyze_chunk, tasks):
+            results.extend(RecognizerResult(entity_type=entity, start=start, end=end, score=score) for start, end, entity, score in found)
+            if report is not None: reports.append(report)
+        elapsed = (time.perf_counter() - began) * 1000
+        return results, _merge_reports(reports, len(spans), elapsed)
+
+    def close(self):
+        self._pool.shutdown()
@@ -0,0 +1,114 @@
+import re
+
+from presidio_analyzer import EntityRecognizer, PatternRecognizer, RecognizerResult
+
+from matchers import compile_terms, can_merge, CombinedPatternScanner
+
+# JARGON
+class JargonRecognizer(EntityRecognizer):
+    """Protected-terms recognizer backed by a cached Aho-Corasick automaton."""
+
+    def __init__(self, terms, supported_entity="CUSTOM_JARGON", name="Jargon_List", score=1.0):
+        self.matcher = compile_terms(terms)
+        self.score = score
+        super().__init__(supported_entities=[supported_entity], name=name, supported_language="en")
+
+    @property
+    def fingerprint(self):
+        return self.matcher.fingerprint
+
+    def load(self):
+        pass
+
+    def analyze(self, text, entities, nlp_artifacts=None):
+        entity = self.supported_entities[0]
+        if entities and entity not in entities: return []
+        return [RecognizerResult(entity_type=entity, start=start, end=end, score=self.score)
+                for start, end in self.matcher.finditer(text)]
+
+# COMBINED PATTERNS
+DEFAULT_REGEX_FLAGS = re.DOTALL | re.MULTILINE | re.IGNORECASE
+SOURCE_ID_KEY = "source_recognizer_identifier"
+
+def _flags(recognizer):
+    return getattr(recognizer, "global_regex_flags", None) or DEFAULT_REGEX_FLAGS
+
+def is_mergeable(recognizer):
+    """Plain regex recognizers only: custom analyze() logic (IBAN) or non-regex ones (phone) stay separate."""
+    if not isinstance(recognizer, PatternRecognizer) or not recognizer.patterns: return False
+    if type(recognizer).analyze is not PatternRecognizer.analyze: return False
+    return all(can_merge(p.regex, _flags(recognizer)) for p in recognizer.patterns)
+
+class CombinedPatternRecognizer(EntityRecognizer):
+    """Runs the patterns of several PatternRecognizers as one compiled scanner.
+
+    Results keep the per-recognizer semantics: the source's validate_result /
+    invalidate_result adjust the score, and context enhancement is done with the
+    source recognizer's own context words.
+    """
+
+    def __init__(self, sources, context_enhancer=None, name="Combined_Patterns"):
+        self.sources = list(sources)
+        self.context_enhancer = context_enhancer
+        self._scanners = {}
+        entities = sorted({entity for r in self.sources for entity in r.supported_entities})
+        super().__init__(supported_entities=entities, name=name, supported_language=self.sources[0].supported_language)
+
+    def load(self):
+        pass
+
+    def _scanner(self, entities):
+        key = frozenset(entities or self.supported_entities)
+        scanner = self._scanners.get(key)
+        if scanner is None:
+            scanner = CombinedPatternScanner([
+                (pattern.regex, _flags(r), (r, pattern))
+                for r in self.sources if r.supported_entities[0] in key
+                for pattern in r.patterns])
+            self._scanners[key] = scanner
+        return scanner
+
+    def analyze(self, text, entities, nlp_artifacts=None):
+        results = []
+        for (recognizer, pattern), start, end in self._scanner(entities).scan(text):
+            matched = text[start:end]
+            score = pattern.score
+            validation = recognizer.validate_result(matched)
+            if validation is not None: score = self.MAX_SCORE if validation else self.MIN_SCORE
+            if recognizer.invalidate_result(matched): score = self.MIN_SCORE
+            if score <= self.MIN_SCORE: continue
+            # The context enhancer updates the explanation, so every result needs its own.
+            explanation = recognizer.build_regex_explanation(
+                recognizer.name, pattern.name, pattern.regex, pattern.score, validation, _flags(recognizer))
+            explanation.score = score
+            results.append(RecognizerResult(
+                entity_type=recognizer.supported_entities[0], start=start, end=end, score=score,
+                analysis_explanation=explanation,
+                recognition_metadata={
+                    RecognizerResult.RECOGNIZER_NAME_KEY: self.name,
+                    RecognizerResult.RECOGNIZER_IDENTIFIER_KEY: self.id,
+                    SOURCE_ID_KEY: recognizer.id,
+                }))
+        return EntityRecognizer.remove_duplicates(results)
+
+    def enhance_using_context(self, text, raw_recognizer_results, other_raw_recognizer_results, nlp_artifacts, context=None):
+        if self.context_enhancer is None or not raw_recognizer_results: return raw_recognizer_results
+        # Let the enhancer see each result as coming from its source recognizer so the
+        # right context words apply, then hand the results back under this recognizer's id.
+        for result in raw_recognizer_results:
+            result.recognition_metadata[RecognizerResult.RECOGNIZER_IDENTIFIER_KEY] = result.recognition_metadata[SOURCE_ID_KEY]
+        results = self.context_enhancer.enhance_using_context(
+            text=text, raw_results=raw_recognizer_results, nlp_artifacts=nlp_artifacts,
+            recognizers=self.sources, context=context)
+        for result in results:
+            result.recognition_metadata[RecognizerResult.RECOGNIZER_IDENTIFIER_KEY] = self.id
+        return results
+
+def install_combined_patterns(analyzer, language="en"):
+    """Replace the analyzer's plain regex recognizers with one CombinedPatternRecognizer."""
+    sources = [r for r in analyzer.registry.recognizers if r.supported_language == language and is_mergeable(r)]
+    if len(sources) < 2: return None
+    for recognizer in sources: analyzer.registry.recognizers.remove(recognizer)
+    combined = CombinedPatternRecognizer(sources, context_enhancer=analyzer.context_aware_enhancer)
+    analyzer.registry.add_recognizer(combined)
+    return combined
@@ -0,0 +1,33 @@
+import re
+
+# RE-IDENTIFICATION
+PLACEHOLDER = re.compile(r"<[A-Z][A-Z0-9_]*>")
+# A "<" that could still grow into a placeholder once more text arrives.
+_PARTIAL = re.compile(r"<[A-Z0-9_]*\Z")
+MAX_PLACEHOLDER_LENGTH = 64
+
+class StreamingUnmasker:
+    """Re-identifies a response that arrives in chunks.
+
+    Text is released as soon as it cannot be part of a placeholder. A trailing
+    "<..." that may still be completed by the next chunk (e.g. "<EMAIL_AD") is
+    held back until it either closes as a placeholder or stops looking like one.
+    """
+
+    def __init__(self, values):
+        self.values = values
+        self._pending = ""
+
+    def _replace(self, text):
+        return PLACEHOLDER.sub(lambda m: self.values.get(m.group(), m.group()), text)
+
+    def feed(self, chunk):
+        text = self._pending + chunk
+        partial = _PARTIAL.search(text, max(0, len(text) - MAX_PLACEHOLDER_LENGTH))
+        cut = partial.start() if partial else len(text)
+        self._pending = text[cut:]
+        return self._replace(text[:cut])
+
+    def flush(self):
+        text, self._pending = self._pending, ""
+        return self._replace(text)
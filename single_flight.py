@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+# SINGLE FLIGHT
+# Concurrent callers asking for the same key share one upstream call: the
+# first caller runs it, the others wait for its result (or its exception).
+class _Call:
+    __slots__ = ("chunks", "done", "result", "error", "cond")
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.result = None
+        self.error = None
+        self.cond = threading.Condition()
+
+class SingleFlight:
+    """Thread-based single flight for blocking calls and for streamed ones."""
+
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._stats = {"upstream": 0, "shared": 0}
+
+    def _join(self, table, key):
+        with self._lock:
+            call = table.get(key)
+            leader = call is None
+            if leader: call = table[key] = _Call()
+            self._stats["upstream" if leader else "shared"] += 1
+            return call, leader
+
+    def _finish(self, table, key, call):
+        with self._lock: del table[key]
+        with call.cond:
+            call.done = True
+            call.cond.notify_all()
+
+    def do(self, key, fn):
+        """fn() for the first caller with `key`; callers arriving while it runs get the same result."""
+        call, leader = self._join(self._calls, key)
+        if not leader:
+            with call.cond: call.cond.wait_for(lambda: call.done)
+            if call.error is not None: raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally: self._finish(self._calls, key, call)
+
+    def stream(self, key, fn):
+        """Yield the chunks of fn() (a generator); callers that join late replay the chunks so far, then follow live."""
+        call, leader = self._join(self._streams, key)
+        if not leader:
+            yield from self._follow(call)
+            return
+        try:
+            for chunk in fn():
+                with call.cond:
+                    call.chunks.append(chunk)
+                    call.cond.notify_all()
+                yield chunk
+        except GeneratorExit:
+            # The first reader stopped early; its followers must not wait for chunks that never come.
+            call.error = RuntimeError("Shared stream abandoned before it completed")
+            raise
+        except BaseException as e:
+            call.error = e
+            raise
+        finally: self._finish(self._streams, key, call)
+
+    def _follow(self, call):
+        position = 0
+        while True:
+            with call.cond:
+                call.cond.wait_for(lambda: call.done or len(call.chunks) > position)
+                chunks, done, error = call.chunks[position:], call.done, call.error
+            for chunk in chunks: yield chunk
+            position += len(chunks)
+            if done and position == len(call.chunks):
+                if error is not None: raise error
+                return
+
+    def stats(self):
+        with self._lock: return dict(self._stats, in_flight=len(self._calls) + len(self._streams))
+
+class AsyncSingleFlight:
+    """asyncio single flight: one task per key, awaited by every caller."""
+
+    def __init__(self):
+        self._tasks = {}
+        self._stats = {"upstream": 0, "shared": 0}
+
+    async def do(self, key, coro_fn):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self._stats["upstream"] += 1
+        else: self._stats["shared"] += 1
+        # shield(): a caller that is cancelled must not cancel the call the others are waiting on.
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return dict(self._stats, in_flight=len(self._tasks))
@@ -0,0 +1,61 @@
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_stub import StubServer, make_server
+
+@pytest.fixture
+def stub():
+    """Starts llm_stub servers on free ports: stub(**make_server options) or stub(handler=...) -> base URL."""
+    servers = []
+
+    def start(handler=None, **options):
+        server = StubServer(("127.0.0.1", 0), handler) if handler is not None else make_server(port=0, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def light_nlp(monkeypatch):
+    """Point privacy_engine at a regex NLP engine, so build_engines() works without a spaCy model.
+
+    Tokens and lemmas come from detection.light_artifacts, which is enough for the
+    pattern recognizers and context enhancement; NER entities (PERSON, LOCATION) are not found.
+    """
+    pytest.importorskip("presidio_analyzer")
+    from presidio_analyzer import AnalyzerEngine
+    from presidio_analyzer.nlp_engine import NlpEngine
+    import privacy_engine
+    from detection import light_artifacts
+
+    class LightNlpEngine(NlpEngine):
+        def load(self): pass
+        def is_loaded(self): return True
+        def process_text(self, text, language): return light_artifacts(text, self, language)
+        def process_batch(self, texts, language, batch_size=1, n_process=1, **kwargs):
+            return [(text, self.process_text(text, language)) for text in texts]
+        def is_stopword(self, word, language): return False
+        def is_punct(self, word, language): return not any(c.isalnum() for c in word)
+        def get_supported_entities(self): return []
+        def get_supported_languages(self): return ["en"]
+
+    engine = LightNlpEngine()
+    monkeypatch.setattr(privacy_engine, "AnalyzerEngine", lambda: AnalyzerEngine(nlp_engine=engine, supported_languages=["en"]))
+    return engine
+
+@pytest.fixture
+def pipeline(light_nlp):
+    """A GatewayPipeline on the light NLP engine, with no audit sink."""
+    from gateway_core import GatewayPipeline
+    pipeline = GatewayPipeline()
+    yield pipeline
+    pipeline.close()
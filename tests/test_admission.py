@@ -0,0 +1,59 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from admission import AdmissionController, Busy, ConcurrencyGate, TokenBucket
+
+def hold_slot(gate, entered, release):
+    def hold():
+        with gate.slot():
+            entered.set()
+            release.wait(5)
+    thread = threading.Thread(target=hold)
+    thread.start()
+    assert entered.wait(5)
+    return thread
+
+def test_waiting_caller_gets_the_slot_when_it_frees():
+    gate, release = ConcurrencyGate("analysis", 1, timeout=5), threading.Event()
+    holder = hold_slot(gate, threading.Event(), release)
+    threading.Timer(0.05, release.set).start()
+    with gate.slot(): assert gate.stats()["active"] == 1
+    holder.join(5)
+    stats = gate.stats()
+    assert stats["admitted"] == 2 and stats["active"] == 0 and stats["max_waiting"] == 1
+
+def test_full_queue_and_deadline_are_refused_with_busy():
+    gate, release = ConcurrencyGate("analysis", 1, max_queue=0, timeout=0.05), threading.Event()
+    holder = hold_slot(gate, threading.Event(), release)
+    with pytest.raises(Busy) as busy:
+        with gate.slot(): pass
+    assert busy.value.stage == "analysis" and busy.value.retry_after > 0
+    gate.max_queue = 1
+    with pytest.raises(Busy, match="no free slot"):
+        with gate.slot(): pass
+    release.set()
+    holder.join(5)
+    assert gate.stats()["rejected"] == {"queue_full": 1, "deadline": 1}
+
+def test_token_bucket_allows_a_burst_then_paces_calls():
+    bucket = TokenBucket("LLM", rate=20, burst=2, timeout=1)
+    began = time.monotonic()
+    for _ in range(4): bucket.acquire()
+    assert 0.08 <= time.monotonic() - began < 0.5  # two tokens free, two more at 20/s
+    asyncio.run(bucket.acquire_async())
+    assert bucket.stats()["admitted"] == 5
+
+def test_token_bucket_refuses_waits_past_its_timeout():
+    bucket = TokenBucket("LLM", rate=1, burst=1, timeout=0.1)
+    bucket.acquire()
+    with pytest.raises(Busy, match="rate limited"): bucket.acquire()
+    assert bucket.stats()["rejected"]["deadline"] == 1
+
+def test_controller_without_a_rate_never_paces_llm_calls():
+    admission = AdmissionController(cpu_limit=2)
+    for _ in range(100): admission.before_llm_call()
+    assert admission.stats()["llm"] is None
+    with admission.cpu_slot(): assert admission.stats()["cpu"]["active"] == 1
@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+pytest.importorskip("presidio_analyzer")
+from gateway_cli import main, process_request
+
+def run(tmp_path, lines, *options):
+    source, sink = tmp_path / "requests.jsonl", tmp_path / "results.jsonl"
+    source.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    code = main([str(source), str(sink), "--mask-only", "--no-audit", "--workers", "2", *options])
+    return code, [json.loads(line) for line in sink.read_text(encoding="utf-8").splitlines()]
+
+def test_masks_requests_in_input_order(light_nlp, tmp_path):
+    lines = [json.dumps({"request_id": f"r{i}", "body": f"Mail user{i}@corp.com about it."}) for i in range(6)]
+    code, results = run(tmp_path, lines)
+    assert code == 0
+    assert [r["request_id"] for r in results] == [f"r{i}" for i in range(6)]
+    assert all(r["status"] == "ok" and r["masked"] == "Mail <EMAIL_ADDRESS_1> about it." for r in results)
+
+def test_bad_lines_fail_alone(light_nlp, tmp_path):
+    lines = ['{"request_id": "a", "body": "card 4111-1111-1111-1111"}', "5", "[1, 2]", '"text"', "{not json",
+             '{"request_id": "b", "body": ""}', '{"request_id": "c", "body": "nothing to hide"}']
+    code, results = run(tmp_path, lines)
+    assert code == 1
+    assert [r["status"] for r in results] == ["ok", "error", "error", "error", "error", "rejected", "ok"]
+    assert [r["line"] for r in results] == list(range(1, 8))
+    assert results[1]["error"] == "Expected a JSON object, got int"
+
+def test_non_object_record_never_reaches_the_pipeline():
+    result, timings = process_request(None, 3, ["body"], "body", "request_id", mask_only=True)
+    assert result == {"line": 3, "status": "error", "error": "Expected a JSON object, got list"} and timings == {}
@@ -0,0 +1,39 @@
+import time
+
+import llm_cache
+from llm_cache import ResponseCache, response_key
+
+MESSAGES = [{"role": "user", "content": "Draft a reply to <PERSON_1>."}]
+
+def test_returns_what_was_stored_under_the_same_request(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm_cache.db"))
+    key = response_key("http://llm/v1", "model", 0.0, MESSAGES)
+    assert cache.get(key) is None
+    cache.put(key, "Dear <PERSON_1>, ...")
+    assert cache.get(key) == "Dear <PERSON_1>, ..."
+    # Any change to what is sent upstream is a different key.
+    assert key != response_key("http://llm/v1", "model", 0.7, MESSAGES)
+    assert key != response_key("http://llm/v1", "other", 0.0, MESSAGES)
+    assert key != response_key("http://llm/v1", "model", 0.0, [{"role": "user", "content": "Draft a reply to <PERSON_2>."}])
+    assert ResponseCache(cache.path).get(key) == "Dear <PERSON_1>, ..."  # persisted
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "llm_cache.db"), ttl=0.05)
+    cache.put("k", "answer")
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    assert cache.stats()["expired"] == 1 and cache.stats()["entries"] == 0
+
+def test_least_recently_used_rows_are_trimmed(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, "TRIM_EVERY", 1)
+    cache = ResponseCache(str(tmp_path / "llm_cache.db"), max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, key)
+        time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.put("c", "c")
+    assert cache.get("b") is None and cache.get("a") == "a" and cache.get("c") == "c"
+    assert cache.stats()["evicted"] == 1
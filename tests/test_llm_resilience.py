@@ -0,0 +1,167 @@
+import time
+import asyncio
+import threading
+
+import pytest
+
+from llm_client import LLMClient
+from llm_resilience import CircuitBreaker, ResilientLLM, LLMTimeout, LLMUnavailable, LLMRejected, CircuitOpen
+from llm_stub import StubHandler
+
+MESSAGES = [{"role": "user", "content": "Summarise the note for <PERSON_1>."}]
+ECHO = "Echo: Summarise the note for <PERSON_1>."
+
+def scripted_handler(plan):
+    """A stub handler that answers request n with plan(n): "ok", "fail" (503), "reject" (400) or a delay in seconds."""
+    lock, seen = threading.Lock(), [0]
+
+    class Handler(StubHandler):
+        def do_POST(self):
+            with lock:
+                seen[0] += 1
+                step = plan(seen[0])
+            if step in ("fail", "reject"):
+                self.rfile.read(int(self.headers.get("Content-Length", "0")))
+                return self._send(503 if step == "fail" else 400, {"error": {"message": f"scripted {step}"}})
+            if isinstance(step, (int, float)): time.sleep(step)
+            super().do_POST()
+
+    return Handler, seen
+
+def resilient(base_url, **options):
+    options.setdefault("backoff", 0.01)
+    return ResilientLLM(LLMClient("stub", base_url, "stub"), **options)
+
+# Circuit breaker
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=3, reset_timeout=60)
+    for _ in range(2): breaker.record(False)
+    breaker.record(True)  # a success resets the count
+    for _ in range(2): breaker.record(False)
+    assert breaker.state == "closed"
+    breaker.record(False)
+    assert breaker.state == "open" and breaker.trips == 1
+    with pytest.raises(CircuitOpen): breaker.before_call()
+
+def test_breaker_lets_one_trial_through_when_half_open():
+    breaker = CircuitBreaker(failures=1, reset_timeout=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    breaker.before_call()
+    with pytest.raises(CircuitOpen): breaker.before_call()  # only one trial at a time
+    breaker.record(True)
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker(failures=1, reset_timeout=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record(False)
+    assert breaker.state == "open" and breaker.trips == 1
+    with pytest.raises(CircuitOpen): breaker.before_call()
+
+# Retries and deadlines
+def test_retries_until_the_provider_answers(stub):
+    handler, seen = scripted_handler(lambda n: "fail" if n <= 2 else "ok")
+    llm = resilient(stub(handler=handler), retries=2)
+    assert llm.chat(MESSAGES) == ECHO
+    assert seen[0] == 3 and llm.stats()["retries"] == 2 and llm.breaker.state == "closed"
+    llm.close()
+
+def test_gives_up_after_the_last_retry(stub):
+    llm = resilient(stub(error_rate=1.0), retries=2)
+    with pytest.raises(LLMUnavailable): llm.chat(MESSAGES)
+    assert llm.stats()["retries"] == 2
+    llm.close()
+
+def test_rejected_requests_are_not_retried_and_leave_the_breaker_closed(stub):
+    handler, seen = scripted_handler(lambda n: "reject")
+    llm = resilient(stub(handler=handler), retries=2, breaker=CircuitBreaker(failures=1))
+    for _ in range(3):
+        with pytest.raises(LLMRejected): llm.chat(MESSAGES)
+    assert seen[0] == 3 and llm.stats()["retries"] == 0 and llm.breaker.state == "closed"
+    llm.close()
+
+def test_deadline_bounds_a_slow_call(stub):
+    llm = resilient(stub(delay=1.0), deadline=0.2, retries=0)
+    started = time.monotonic()
+    with pytest.raises(LLMTimeout): llm.chat(MESSAGES)
+    assert time.monotonic() - started < 0.8
+    assert llm.stats()["timeouts"] == 1
+    llm.close()
+
+def test_open_breaker_fails_fast_and_recovers(stub):
+    handler, seen = scripted_handler(lambda n: "fail" if n <= 2 else "ok")
+    llm = resilient(stub(handler=handler), retries=0, breaker=CircuitBreaker(failures=2, reset_timeout=0.1))
+    for _ in range(2):
+        with pytest.raises(LLMUnavailable): llm.chat(MESSAGES)
+    with pytest.raises(CircuitOpen): llm.chat(MESSAGES)
+    assert seen[0] == 2 and llm.stats()["rejected_fast"] == 1
+    time.sleep(0.12)
+    assert llm.chat(MESSAGES) == ECHO
+    assert llm.breaker.state == "closed"
+    llm.close()
+
+def test_rejected_trial_does_not_wedge_the_breaker(stub):
+    handler, seen = scripted_handler(lambda n: "fail" if n == 1 else "reject" if n == 2 else "ok")
+    llm = resilient(stub(handler=handler), retries=0, breaker=CircuitBreaker(failures=1, reset_timeout=0.05))
+    with pytest.raises(LLMUnavailable): llm.chat(MESSAGES)
+    time.sleep(0.06)
+    with pytest.raises(LLMRejected): llm.chat(MESSAGES)  # the half-open trial gets a 400
+    assert llm.chat(MESSAGES) == ECHO
+    assert seen[0] == 3 and llm.breaker.state == "closed"
+    llm.close()
+
+def test_cancelled_trial_does_not_wedge_the_breaker(stub):
+    handler, seen = scripted_handler(lambda n: "fail" if n == 1 else 1.0 if n == 2 else "ok")
+    llm = resilient(stub(handler=handler), retries=0, breaker=CircuitBreaker(failures=1, reset_timeout=0.05))
+    with pytest.raises(LLMUnavailable): llm.chat(MESSAGES)
+    time.sleep(0.06)
+
+    async def cancel_trial():
+        with pytest.raises(asyncio.TimeoutError): await asyncio.wait_for(llm.achat(MESSAGES), 0.1)
+        return await llm.achat(MESSAGES)
+
+    assert asyncio.run(cancel_trial()) == ECHO
+    llm.close()
+
+def test_async_retries(stub):
+    handler, seen = scripted_handler(lambda n: "fail" if n == 1 else "ok")
+    llm = resilient(stub(handler=handler), retries=1)
+
+    async def run():
+        try: return await llm.achat(MESSAGES)
+        finally: await llm.aclose()
+
+    assert asyncio.run(run()) == ECHO
+    assert seen[0] == 2
+    llm.close()
+
+def test_stream_is_retried_before_its_first_chunk(stub):
+    handler, seen = scripted_handler(lambda n: "fail" if n == 1 else "ok")
+    llm = resilient(stub(handler=handler), retries=1)
+    assert "".join(llm.stream_chat(MESSAGES)) == ECHO
+    assert seen[0] == 2
+    llm.close()
+
+# Hedging
+def test_hedge_races_a_slow_request(stub):
+    # Twenty fast calls set the latency quantile; the next one stalls and is hedged by a fast one.
+    handler, seen = scripted_handler(lambda n: 2.0 if n == 21 else "ok")
+    llm = resilient(stub(handler=handler), hedge=True, hedge_quantile=0.5, hedge_min_samples=20)
+    for _ in range(20): llm.chat(MESSAGES)
+    started = time.monotonic()
+    assert llm.chat(MESSAGES) == ECHO
+    assert time.monotonic() - started < 1.0
+    stats = llm.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    llm.close()
+
+def test_no_hedging_before_enough_samples(stub):
+    llm = resilient(stub(delay=0.05), hedge=True, hedge_min_samples=20)
+    for _ in range(5): llm.chat(MESSAGES)
+    assert llm.stats()["hedged"] == 0
+    llm.close()
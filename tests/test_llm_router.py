@@ -0,0 +1,121 @@
+import time
+import asyncio
+
+import pytest
+
+from llm_client import LLMClient
+from llm_resilience import CircuitBreaker, ResilientLLM, LLMUnavailable, LLMRejected
+from llm_router import Backend, LLMRouter
+from llm_stub import StubHandler
+
+MESSAGES = [{"role": "user", "content": "Draft a reply to <PERSON_1>."}]
+ECHO = "Echo: Draft a reply to <PERSON_1>."
+
+class RejectingHandler(StubHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", "0")))
+        self._send(400, {"error": {"message": "bad request"}})
+
+def backend(name, base_url, failures=5, reset_timeout=60):
+    llm = ResilientLLM(LLMClient("stub", base_url, name), retries=0, breaker=CircuitBreaker(failures=failures, reset_timeout=reset_timeout))
+    return Backend(name, llm)
+
+@pytest.fixture
+def routers():
+    made = []
+
+    def make(*backends, **options):
+        options.setdefault("explore", 0.0)
+        router = LLMRouter(backends, **options)
+        made.append(router)
+        return router
+
+    yield make
+    for router in made: router.close()
+
+def test_fails_over_to_the_next_backend(stub, routers):
+    down, up = backend("down", stub(error_rate=1.0)), backend("up", stub())
+    router = routers(down, up)
+    assert router.chat(MESSAGES) == ECHO
+    assert router.stats()["failovers"] == 1
+    assert down.failures == 1 and up.calls == 1 and up.failures == 0
+
+def test_failing_backend_is_ranked_last(stub, routers):
+    down, up = backend("down", stub(error_rate=1.0)), backend("up", stub())
+    router = routers(down, up)
+    router.chat(MESSAGES)
+    assert router.ranked()[0] is up
+    for _ in range(5): router.chat(MESSAGES)
+    assert down.calls == 1 and router.stats()["failovers"] == 1
+
+def test_backend_with_open_breaker_is_skipped(stub, routers):
+    down, up = backend("down", stub(error_rate=1.0), failures=1), backend("up", stub())
+    router = routers(down, up)
+    router.chat(MESSAGES)
+    assert down.llm.breaker.state == "open"
+    assert router.ranked() == [up, down]
+    assert router.stats()["backends"]["down"]["breaker"] == "open"
+
+def test_exploration_only_picks_backends_with_a_closed_breaker(stub, routers):
+    down = backend("down", stub(error_rate=1.0), failures=1, reset_timeout=0.05)
+    best, other = backend("best", stub()), backend("other", stub())
+    router = routers(best, other, down, explore=1.0)
+    down.llm.breaker.record(False)
+    down.calls = best.calls = other.calls = 1
+    best.latency_ms, other.latency_ms = 1.0, 100.0
+    time.sleep(0.06)
+    assert down.llm.breaker.state == "half-open" and down.available()
+    for _ in range(20): assert router.ranked() == [other, best, down]
+
+def test_prefers_the_faster_backend(stub, routers):
+    slow, fast = backend("slow", stub(delay=0.1)), backend("fast", stub())
+    router = routers(slow, fast)
+    for _ in range(10): router.chat(MESSAGES)
+    assert fast.latency_ms < slow.latency_ms
+    assert fast.calls > slow.calls
+
+def test_rejected_request_does_not_fail_over(stub, routers):
+    rejecting, up = backend("rejecting", stub(handler=RejectingHandler)), backend("up", stub())
+    router = routers(rejecting, up)
+    with pytest.raises(LLMRejected): router.chat(MESSAGES)
+    assert up.calls == 0 and router.stats()["failovers"] == 0
+
+def test_raises_when_every_backend_fails(stub, routers):
+    router = routers(backend("a", stub(error_rate=1.0)), backend("b", stub(error_rate=1.0)))
+    with pytest.raises(LLMUnavailable): router.chat(MESSAGES)
+    assert router.stats()["failovers"] == 1
+
+def test_stream_fails_over_before_the_first_chunk(stub, routers):
+    down, up = backend("down", stub(error_rate=1.0)), backend("up", stub())
+    router = routers(down, up)
+    assert "".join(router.stream_chat(MESSAGES)) == ECHO
+    assert router.stats()["failovers"] == 1 and up.in_flight == 0 and down.in_flight == 0
+
+def test_streams_and_completions_keep_separate_estimates(stub, routers):
+    up = backend("up", stub())
+    router = routers(up)
+    "".join(router.stream_chat(MESSAGES))
+    assert up.first_token_ms is not None and up.latency_ms is None
+    first_token_ms = up.first_token_ms
+    router.chat(MESSAGES)
+    assert up.latency_ms is not None and up.first_token_ms == first_token_ms
+
+def test_streams_are_ranked_by_time_to_first_token(stub, routers):
+    quick_start, quick_finish = backend("quick_start", stub()), backend("quick_finish", stub())
+    router = routers(quick_start, quick_finish)
+    quick_start.calls = quick_finish.calls = 1
+    quick_start.latency_ms, quick_start.first_token_ms = 500.0, 20.0
+    quick_finish.latency_ms, quick_finish.first_token_ms = 100.0, 80.0
+    assert router.ranked() == [quick_finish, quick_start]
+    assert router.ranked(stream=True) == [quick_start, quick_finish]
+
+def test_async_failover(stub, routers):
+    down, up = backend("down", stub(error_rate=1.0)), backend("up", stub())
+    router = routers(down, up)
+
+    async def run():
+        try: return await router.achat(MESSAGES)
+        finally: await router.aclose()
+
+    assert asyncio.run(run()) == ECHO
+    assert router.stats()["failovers"] == 1
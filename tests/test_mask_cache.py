@@ -0,0 +1,56 @@
+import json
+import argparse
+
+import pytest
+
+pytest.importorskip("presidio_analyzer")
+from mask_cache import MaskCache
+from benchmark import bench_cache
+
+TEXTS = [
+    "Email jane.doe@corp.com about Project Falcon.",
+    "My ssn is 123-45-6789 and my card is 4111-1111-1111-1111.",
+    "Call 212-555-0199, then mail ops@corp.com and jane.doe@corp.com again.",
+    "Project Falcon ships before the falcon migration.",
+    "Nothing sensitive here.",
+]
+
+def masked(pipeline, texts):
+    return [(safe_text, dict(vault.values)) for safe_text, vault, _ in map(pipeline.mask_pii, texts)]
+
+def uncached(pipeline, texts):
+    cache, pipeline.mask_cache = pipeline.mask_cache, None
+    try: return masked(pipeline, texts)
+    finally: pipeline.mask_cache = cache
+
+def test_memory_hits_match_uncached_masking(pipeline):
+    pipeline.mask_cache = MaskCache(len(TEXTS))
+    expected = uncached(pipeline, TEXTS)
+    assert masked(pipeline, TEXTS) == expected
+    assert masked(pipeline, TEXTS) == expected
+    stats = pipeline.mask_cache.stats()
+    assert stats["misses"] == len(TEXTS) and stats["hits"] == len(TEXTS)
+
+def test_disk_hits_match_uncached_masking(pipeline, tmp_path):
+    path = str(tmp_path / "mask_cache.db")
+    pipeline.mask_cache = MaskCache(len(TEXTS), path=path)
+    expected = masked(pipeline, TEXTS)
+    pipeline.mask_cache = MaskCache(len(TEXTS), path=path)  # empty memory, same file
+    assert masked(pipeline, TEXTS) == expected == uncached(pipeline, TEXTS)
+    assert pipeline.mask_cache.stats()["disk_hits"] == len(TEXTS)
+
+def test_changing_the_jargon_invalidates_entries(pipeline, tmp_path):
+    pipeline.mask_cache = MaskCache(len(TEXTS), path=str(tmp_path / "mask_cache.db"))
+    before = masked(pipeline, TEXTS)
+    pipeline.set_jargon(["Project Falcon"])
+    after = masked(pipeline, TEXTS)
+    assert after == uncached(pipeline, TEXTS) and after != before
+    assert "<CUSTOM_JARGON_1>" in after[0][0] and pipeline.mask_cache.stats()["hits"] == 0
+    pipeline.set_jargon([])
+    assert masked(pipeline, TEXTS) == before
+
+def test_bench_cache_finds_no_mismatches(light_nlp, tmp_path, capsys):
+    source = tmp_path / "requests.jsonl"
+    source.write_text("".join(json.dumps({"body": text}) + "\n" for text in TEXTS), encoding="utf-8")
+    bench_cache(argparse.Namespace(input=str(source), field="body", repeat=1))
+    assert f"{len(TEXTS)} disk hits; 0 cached outputs differ" in capsys.readouterr().out
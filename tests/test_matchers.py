@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from matchers import AhoCorasick, compile_terms, terms_fingerprint
+
+TERMS = ["Project Falcon", "falcon", "Falcon X", "data", "data lake", "lake", "ake", "AI", "a.i.", "C++", "Ünïcode"]
+
+TEXTS = [
+    "project falcon and PROJECT FALCON and Project  Falcon",
+    "The falcon-x team moved Falcon X into the data lake; data lakes are not lakes.",
+    "metadata, database, datalake and data_lake are not terms, but (data) and 'lake' are.",
+    "AI, ai, said, A.I. and a.i.s; C++ or c++11 but not C+.",
+    "ünïcode ÜNÏCODE Ünïcodes",
+    "",
+    "falcon",
+]
+
+def deny_list_spans(terms, text):
+    # The regex deny-list it replaced; longest terms first so the alternation prefers the longest match, as the automaton does.
+    pytest.importorskip("presidio_analyzer")
+    from presidio_analyzer import PatternRecognizer
+    recognizer = PatternRecognizer(supported_entity="CUSTOM_JARGON", deny_list=sorted({t.lower() for t in terms}, key=len, reverse=True))
+    return sorted((r.start, r.end) for r in recognizer.analyze(text, ["CUSTOM_JARGON"]))
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_automaton_matches_the_regex_deny_list(text):
+    assert list(AhoCorasick(TERMS).finditer(text)) == deny_list_spans(TERMS, text)
+
+def test_random_texts_match_the_regex_deny_list():
+    rng = random.Random(7)
+    words = ["data", "lake", "Data", "LAKE", "falcon", "project", "x", "ake", "metadata", "-", "_", " ", ".", "AI"]
+    terms = ["data lake", "data", "lake", "project falcon", "falcon x", "ake", "ai"]
+    for _ in range(200):
+        text = "".join(rng.choice(words) + rng.choice(["", " ", " ", ", "]) for _ in range(rng.randint(0, 12)))
+        assert list(AhoCorasick(terms).finditer(text)) == deny_list_spans(terms, text), text
+
+def test_matches_are_whole_words_and_case_insensitive():
+    text = "Falcon falconry FALCON_ hawkfalcon falcon."
+    assert [text[s:e] for s, e in AhoCorasick(["falcon"]).finditer(text)] == ["Falcon", "falcon"]
+
+def test_compiled_automata_are_cached_by_normalised_terms():
+    automaton = compile_terms(["Falcon", " data lake "])
+    assert compile_terms(["data lake", "falcon", "FALCON"]) is automaton
+    assert automaton.fingerprint == terms_fingerprint(["DATA LAKE", "falcon"])
+    assert list(AhoCorasick([]).finditer("anything")) == []
@@ -0,0 +1,63 @@
+import re
+
+import pytest
+
+from matchers import CombinedPatternScanner
+
+# COMBINED SCANNER
+def finditer_spans(entries, text):
+    return sorted((payload, m.start(), m.end()) for regex, flags, payload in entries
+                  for m in re.finditer(regex, text, flags) if m.end() > m.start())
+
+def scanner_spans(entries, text):
+    return sorted(CombinedPatternScanner(entries).scan(text))
+
+SCANNER_CASES = [
+    # Overlapping matches of different patterns at the same and at shifted positions.
+    ([r"\b\d{3}-\d{2}-\d{4}\b", r"\b\d{3}\b", r"\d{2}-\d{4}"], "ssn 123-45-6789 and 987-65-4321."),
+    ([r"\bab", r"abc", r"bcd", r"\bcd\b"], "abcd ab cd abcdabcd"),
+    # Adjacent matches: one pattern's match ends where another's (or its own) starts.
+    ([r"\d+", r"[a-z]+", r"\b[a-z]\d"], "a1b22c333 x9y"),
+    ([r"aa", r"a"], "aaaaa"),
+    # Alternation inside a pattern and a \b-group that cannot be hoisted.
+    ([r"(\bcat|dog)", r"\b(?:cat|cats)\b", r"s\b"], "cats dogs catdog"),
+]
+
+@pytest.mark.parametrize("patterns, text", SCANNER_CASES)
+def test_scanner_matches_finditer_per_pattern(patterns, text):
+    entries = [(regex, re.IGNORECASE, index) for index, regex in enumerate(patterns)]
+    assert scanner_spans(entries, text) == finditer_spans(entries, text)
+
+def test_scanner_keeps_flag_groups_apart():
+    entries = [(r"^x", re.MULTILINE, "multiline"), (r"^x", 0, "plain"), (r"X", re.IGNORECASE, "ignorecase")]
+    text = "x\nx X"
+    assert scanner_spans(entries, text) == finditer_spans(entries, text)
+
+# COMBINED RECOGNIZER
+CONTEXT_TEXTS = [
+    "email john@corp.com",
+    "credit card 4111111111111111",
+    "My ssn is 123-45-6789, phone 212-555-0199 and card 4111-1111-1111-1111.",
+    "Wire it to IBAN GB82WEST12345698765432, visit https://corp.example.com or 10.0.0.1.",
+    "No identifiers in this sentence at all.",
+]
+
+def analyze(analyzer, text):
+    from privacy_engine import TARGET_ENTITIES
+    results = analyzer.analyze(text=text, language="en", entities=TARGET_ENTITIES)
+    return sorted((r.entity_type, r.start, r.end, round(r.score, 6)) for r in results)
+
+@pytest.mark.parametrize("text", CONTEXT_TEXTS)
+def test_combined_patterns_match_separate_recognizers(light_nlp, text):
+    from privacy_engine import build_engines
+    combined, _ = build_engines(combined_patterns=True)
+    separate, _ = build_engines(combined_patterns=False)
+    assert any(r.name == "Combined_Patterns" for r in combined.registry.recognizers)
+    assert analyze(combined, text) == analyze(separate, text)
+
+def test_combined_results_carry_explanations(light_nlp):
+    from privacy_engine import build_engines
+    analyzer, _ = build_engines(combined_patterns=True)
+    results = analyzer.analyze(text="email john@corp.com", language="en", return_decision_process=True)
+    email = [r for r in results if r.entity_type == "EMAIL_ADDRESS"]
+    assert email and email[0].analysis_explanation.score_context_improvement > 0
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from reidentify import StreamingUnmasker, PLACEHOLDER
+
+VALUES = {"<PERSON_1>": "John Doe", "<EMAIL_ADDRESS_1>": "john@example.com", "<PERSON_2>": "Jane <Roe>"}
+RESPONSE = "Hi <PERSON_1>, write to <EMAIL_ADDRESS_1> or ask <PERSON_2>. Keep <UNKNOWN_1> and a < b, <not a tag>, x<PERSON_1>"
+
+def unmask(text):
+    return PLACEHOLDER.sub(lambda m: VALUES.get(m.group(), m.group()), text)
+
+def stream(chunks):
+    unmasker = StreamingUnmasker(VALUES)
+    released = [unmasker.feed(chunk) for chunk in chunks]
+    return "".join(released) + unmasker.flush(), released
+
+@pytest.mark.parametrize("cut", range(len(RESPONSE) + 1))
+def test_every_split_point_matches_one_pass(cut):
+    assert stream([RESPONSE[:cut], RESPONSE[cut:]])[0] == unmask(RESPONSE)
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_chunkings_match_one_pass(seed):
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(RESPONSE)), rng.randint(1, 20)))
+    chunks = [RESPONSE[a:b] for a, b in zip([0] + cuts, cuts + [len(RESPONSE)])]
+    assert stream(chunks)[0] == unmask(RESPONSE)
+
+def test_single_character_chunks():
+    assert stream(list(RESPONSE))[0] == unmask(RESPONSE)
+
+def test_partial_placeholder_is_held_back():
+    text, released = stream(["Mail <EMAIL_AD", "DRESS_1> now"])
+    assert released == ["Mail ", "john@example.com now"]
+    assert text == "Mail john@example.com now"
+
+def test_text_that_cannot_be_a_placeholder_is_released():
+    _, released = stream(["a <b", " and <PERSON_1", "> ok"])
+    assert released[0] == "a <b"
+    assert released[1] == " and "
+
+def test_unfinished_placeholder_is_flushed_verbatim():
+    assert stream(["Ends with <PERSON_"])[0] == "Ends with <PERSON_"
+
+def test_unknown_placeholder_is_left_alone():
+    assert stream(["<PERSON_9>"])[0] == "<PERSON_9>"
@@ -0,0 +1,94 @@
+import time
+import asyncio
+import threading
+
+from single_flight import SingleFlight, AsyncSingleFlight
+
+def run_together(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join(5)
+
+def test_concurrent_callers_share_one_call():
+    flights, release, calls, results = SingleFlight(), threading.Event(), [], []
+
+    def upstream():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    def caller(): results.append(flights.do("key", upstream))
+
+    threading.Timer(0.1, release.set).start()
+    run_together(5, caller)
+    assert results == ["answer"] * 5 and len(calls) == 1
+    assert flights.stats() == {"upstream": 1, "shared": 4, "in_flight": 0}
+    assert flights.do("key", lambda: "fresh") == "fresh"  # finished calls are not cached
+
+def test_followers_get_the_leaders_exception():
+    flights, release, errors = SingleFlight(), threading.Event(), []
+
+    def upstream():
+        release.wait(5)
+        raise ValueError("upstream down")
+
+    def caller():
+        try: flights.do("key", upstream)
+        except ValueError as e: errors.append(str(e))
+
+    threading.Timer(0.1, release.set).start()
+    run_together(3, caller)
+    assert errors == ["upstream down"] * 3 and flights.stats()["upstream"] == 1
+
+def test_late_stream_followers_replay_earlier_chunks():
+    flights, gate = SingleFlight(), threading.Event()
+
+    def upstream():
+        yield "a"
+        gate.wait(5)
+        yield "b"
+
+    leader = flights.stream("key", upstream)
+    assert next(leader) == "a"
+    follower, chunks = flights.stream("key", upstream), []
+    thread = threading.Thread(target=lambda: chunks.extend(follower))
+    thread.start()
+    gate.set()
+    assert list(leader) == ["b"]
+    thread.join(5)
+    assert chunks == ["a", "b"]
+
+def test_abandoned_stream_fails_its_followers():
+    flights = SingleFlight()
+    leader = flights.stream("key", lambda: iter(["a", "b"]))
+    next(leader)
+    errors = []
+
+    def follow():
+        try: list(flights.stream("key", lambda: iter(["unused"])))
+        except RuntimeError as e: errors.append(e)
+
+    thread = threading.Thread(target=follow)
+    thread.start()
+    while flights.stats()["shared"] == 0: time.sleep(0.001)
+    leader.close()
+    thread.join(5)
+    assert len(errors) == 1
+
+def test_async_callers_share_one_task_and_survive_a_cancelled_caller():
+    flights, calls = AsyncSingleFlight(), []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        impatient = asyncio.ensure_future(flights.do("key", upstream))
+        patient = asyncio.ensure_future(flights.do("key", upstream))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return await patient
+
+    assert asyncio.run(run()) == "answer" and len(calls) == 1
+    assert flights.stats() == {"upstream": 1, "shared": 1, "in_flight": 0}
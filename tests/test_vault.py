@@ -0,0 +1,30 @@
+import pytest
+
+from vault import PlaceholderVault, Span
+
+TEXT = "Ann Lee met Bob Ray; Ann Lee mailed ann@corp.com."
+SPANS = [Span("PERSON", 0, 7), Span("PERSON", 12, 19), Span("PERSON", 21, 28), Span("EMAIL_ADDRESS", 36, 48)]
+
+def test_repeated_values_share_a_numbered_placeholder():
+    vault = PlaceholderVault()
+    safe_text = vault.mask(TEXT, SPANS)
+    assert safe_text == "<PERSON_1> met <PERSON_2>; <PERSON_1> mailed <EMAIL_ADDRESS_1>."
+    assert vault.values == {"<PERSON_1>": "Ann Lee", "<PERSON_2>": "Bob Ray", "<EMAIL_ADDRESS_1>": "ann@corp.com"}
+    assert vault.masked == 4 and len(vault) == 3
+    assert vault.unmask(safe_text) == TEXT
+
+def test_later_turns_continue_the_numbering_after_compact():
+    vault = PlaceholderVault()
+    vault.mask(TEXT, SPANS)
+    vault.compact()
+    assert vault.mask("Bob Ray and Cy Sun", [Span("PERSON", 0, 7), Span("PERSON", 12, 18)]) == "<PERSON_2> and <PERSON_3>"
+
+def test_overlapping_spans_are_masked_once():
+    vault = PlaceholderVault()
+    assert vault.mask("call 212-555-0199", [Span("PHONE_NUMBER", 5, 17), Span("US_SSN", 9, 17)]) == "call <PHONE_NUMBER_1>"
+    assert vault.masked == 1
+
+def test_unknown_placeholders_are_left_alone():
+    vault = PlaceholderVault.from_values({"<PERSON_1>": "Ann Lee"})
+    assert vault.unmask("<PERSON_1> and <PERSON_2>") == "Ann Lee and <PERSON_2>"
+    with pytest.raises(ValueError): PlaceholderVault.from_values({"PERSON_1": "Ann Lee"})
@@ -0,0 +1,39 @@
+import time
+
+from vault import PlaceholderVault, VaultStore
+
+def vault_of(n, size=10):
+    return PlaceholderVault.from_values({f"<PERSON_{i}>": "x" * size for i in range(1, n + 1)})
+
+def test_stores_and_returns_vaults_by_id():
+    store = VaultStore()
+    vault = vault_of(2)
+    vault_id = store.put(vault)
+    assert store.get(vault_id) is vault and store.get("unknown") is None
+    assert store.put(vault_of(1), vault_id=vault_id) == vault_id  # replaced, not added
+    assert store.stats()["vaults"] == 1
+    store.discard(vault_id)
+    assert store.get(vault_id) is None and store.stats()["bytes"] == 0
+
+def test_entries_expire_after_the_ttl_since_last_use():
+    store = VaultStore(ttl=0.1)
+    kept, dropped = store.put(vault_of(1)), store.put(vault_of(1))
+    time.sleep(0.06)
+    assert store.get(kept) is not None  # pushes its expiry out
+    time.sleep(0.06)
+    assert store.get(kept) is not None and store.get(dropped) is None
+    assert store.stats()["expired"] == 1
+
+def test_least_recently_used_vaults_are_evicted_over_the_byte_cap():
+    one = vault_of(20, size=200).nbytes()
+    store = VaultStore(max_bytes=int(one * 2.5))
+    a, b = store.put(vault_of(20, size=200)), store.put(vault_of(20, size=200))
+    store.get(a)
+    c = store.put(vault_of(20, size=200))
+    assert store.get(b) is None and store.get(a) is not None and store.get(c) is not None
+    assert store.stats()["evicted"] == 1 and store.stats()["bytes"] <= store.max_bytes
+
+def test_a_vault_larger_than_the_cap_is_still_kept():
+    store = VaultStore(max_bytes=1)
+    vault_id = store.put(vault_of(5))
+    assert store.get(vault_id) is not None
@@ -0,0 +1,163 @@
+import sys
+import time
+import secrets
+import threading
+from collections import OrderedDict, namedtuple
+
+from reidentify import PLACEHOLDER
+
+# PLACEHOLDER VAULT
+Span = namedtuple("Span", "entity_type start end")
+
+class PlaceholderVault:
+    """Numbered placeholders (<PERSON_1>, <PERSON_2>, ...) and the original values they stand for.
+
+    A value seen again under the same entity type gets the same placeholder, so
+    the LLM can tell two people apart and repeated mentions stay consistent.
+    """
+
+    __slots__ = ("values", "masked", "_placeholders", "_counts")
+
+    def __init__(self):
+        self.values = {}          # placeholder -> original value
+        self.masked = 0           # spans replaced by mask(), repeats included
+        self._placeholders = None  # (entity type, value) -> placeholder, rebuilt on demand
+        self._counts = None        # entity type -> last number issued
+
+    @classmethod
+    def from_values(cls, values):
+        vault = cls()
+        for placeholder, value in values.items():
+            if not PLACEHOLDER.fullmatch(placeholder): raise ValueError(f"Not a placeholder: {placeholder!r}")
+            vault.values[placeholder] = value
+        return vault
+
+    def __len__(self):
+        return len(self.values)
+
+    def nbytes(self):
+        """Approximate memory held by the mapping (the dicts and their strings)."""
+        size = sys.getsizeof(self.values) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in self.values.items())
+        if self._placeholders is not None:
+            # The index keys are (type, value) tuples over strings already counted above.
+            size += sys.getsizeof(self._placeholders) + sys.getsizeof(self._counts) + sum(sys.getsizeof(key) for key in self._placeholders)
+        return size
+
+    def compact(self):
+        """Drop the reverse index; only placeholder -> value pairs stay in memory."""
+        self._placeholders = self._counts = None
+
+    def _index(self):
+        self._placeholders, self._counts = {}, {}
+        for placeholder, value in self.values.items():
+            entity_type, _, number = placeholder[1:-1].rpartition("_")
+            if not number.isdigit(): continue
+            self._placeholders[(entity_type, value)] = placeholder
+            self._counts[entity_type] = max(self._counts.get(entity_type, 0), int(number))
+
+    def placeholder(self, entity_type, value):
+        if self._placeholders is None: self._index()
+        key = (entity_type, value)
+        placeholder = self._placeholders.get(key)
+        if placeholder is None:
+            number = self._counts.get(entity_type, 0) + 1
+            self._counts[entity_type] = number
+            # Interned: "<PERSON_1>" is the same key in every session's vault.
+            placeholder = sys.intern(f"<{entity_type}_{number}>")
+            self._placeholders[key] = placeholder
+            self.values[placeholder] = value
+        return placeholder
+
+    def mask(self, text, spans):
+        """Replace each span (anything with entity_type/start/end, in `text` coordinates) by its placeholder."""
+        parts, pos = [], 0
+        for span in sorted(spans, key=lambda s: s.start):
+            if span.start < pos: continue  # overlapping spans are resolved by the anonymizer; never splice twice
+            parts.append(text[pos:span.start])
+            parts.append(self.placeholder(span.entity_type, text[span.start:span.end]))
+            pos = span.end
+            self.masked += 1
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    def unmask(self, text):
+        """Restore every known placeholder in one regex pass; unknown ones are left as they are."""
+        values = self.values
+        return PLACEHOLDER.sub(lambda m: values.get(m.group(), m.group()), text)
+
+# SESSION VAULT STORE
+class _Entry:
+    __slots__ = ("vault", "expires", "nbytes")
+
+    def __init__(self, vault, expires):
+        self.vault = vault
+        self.expires = expires
+        self.nbytes = vault.nbytes()
+
+class VaultStore:
+    """Vaults kept between requests, addressed by an opaque id.
+
+    Entries expire `ttl` seconds after they were last used, and the least
+    recently used ones are evicted once the total exceeds `max_bytes`. Because
+    every access pushes the expiry out by the same ttl, LRU order is also
+    expiry order, so both kinds of eviction pop from the front.
+    """
+
+    def __init__(self, ttl=1800.0, max_bytes=64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"stored": 0, "expired": 0, "evicted": 0}
+
+    def put(self, vault, vault_id=None, compact=True):
+        """Store (or replace) a vault and return its id.
+
+        Keep `compact=False` for vaults that will be masked into again (conversations),
+        so the next turn does not rebuild the value -> placeholder index.
+        """
+        if compact: vault.compact()
+        vault_id = vault_id or secrets.token_urlsafe(16)
+        now = time.monotonic()
+        with self._lock:
+            self._remove(vault_id)
+            entry = self._entries[vault_id] = _Entry(vault, now + self.ttl)
+            self._bytes += entry.nbytes
+            self._stats["stored"] += 1
+            self._expire(now)
+            # Never evict the entry just stored, even if it alone exceeds the cap.
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self._stats["evicted"] += 1
+        return vault_id
+
+    def get(self, vault_id):
+        """The vault for `vault_id`, or None once it has expired or been evicted."""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(vault_id)
+            if entry is None: return None
+            entry.expires = now + self.ttl
+            self._entries.move_to_end(vault_id)
+            return entry.vault
+
+    def discard(self, vault_id):
+        with self._lock: self._remove(vault_id)
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return dict(self._stats, vaults=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+
+    def _remove(self, vault_id):
+        entry = self._entries.pop(vault_id, None)
+        if entry is not None: self._bytes -= entry.nbytes
+
+    def _expire(self, now):
+        while self._entries:
+            vault_id, entry = next(iter(self._entries.items()))
+            if entry.expires > now: break
+            self._remove(vault_id)
+            self._stats["expired"] += 1